@@ -1,9 +1,128 @@
 """Action objects are the core piece of trackable computation in Aeromancy."""
 
-from .artifacts import WandbArtifactName
+import hashlib
+import queue
+import threading
+from collections.abc import Iterator, Sequence
+from pathlib import Path, PurePath
+from typing import Any
+
+import msgspec
+from loguru import logger
+from typing_extensions import override
+
+from .artifacts import AeromancyArtifact, WandbArtifactName
+from .runtime_environment import get_runtime_environment
+from .s3 import S3Object
 from .tracker import Tracker
 from .wandb_tracker import WandbTracker
 
+# Cached in place of a fingerprint for `Action`s which can't be fingerprinted.
+_NO_FINGERPRINT = ""
+
+
+def _fingerprint_enc_hook(obj: Any) -> Any:
+    """Encode config values that msgspec doesn't support (if it's lossless)."""
+    if isinstance(obj, PurePath):
+        return str(obj)
+    # Things like repr() would be lossy (e.g., for large numpy arrays), so
+    # changes to these wouldn't necessarily change the fingerprint.
+    raise TypeError(f"Can't fingerprint objects of type {type(obj)}")
+
+
+class _BackgroundLoggingTracker(Tracker):
+    """Proxy for a `Tracker` which sends metrics from a background thread.
+
+    `log()` calls are queued and sent in order by a single daemon thread so
+    that `Action.run()` doesn't wait on the `Tracker` backend. Each `log()`
+    call is still sent separately, since backends such as Weights and Biases
+    treat each call as a new step. Everything else is passed through to the
+    wrapped `Tracker` directly.
+
+    Should only be used by `Action._run`.
+    """
+
+    def __init__(self, tracker: Tracker):
+        # Tracker.__init__ is intentionally skipped: attributes are looked up
+        # on the wrapped tracker instead (see __getattr__).
+        self._tracker = tracker
+        self._metrics_queue: queue.Queue[dict[str, Any] | None] = queue.Queue()
+        self._log_error: Exception | None = None
+        self._log_thread = threading.Thread(target=self._send_metrics, daemon=True)
+        self._log_thread.start()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._tracker, name)
+
+    def _send_metrics(self) -> None:
+        while (metrics := self._metrics_queue.get()) is not None:
+            if self._log_error is not None:
+                continue
+            try:
+                self._tracker.log(metrics)
+            except Exception as log_error:  # noqa: BLE001
+                # Reraised in the main thread by close().
+                self._log_error = log_error
+
+    def close(self) -> Exception | None:
+        """Wait for all queued metrics to be sent.
+
+        Returns
+        -------
+            The first exception raised while sending metrics, if any.
+        """
+        self._metrics_queue.put(None)
+        self._log_thread.join()
+        return self._log_error
+
+    @override
+    def __enter__(self):
+        return self
+
+    @override
+    def __exit__(self, exctype, excinst, exctb) -> bool:
+        return False
+
+    @override
+    def declare_output(
+        self,
+        name: str,
+        local_filenames: Sequence[Path],
+        s3_destination: S3Object,
+        artifact_type: str,
+        strip_prefix: Path | None = None,
+        metadata: dict | None = None,
+    ) -> AeromancyArtifact:
+        return self._tracker.declare_output(
+            name=name,
+            local_filenames=local_filenames,
+            s3_destination=s3_destination,
+            artifact_type=artifact_type,
+            strip_prefix=strip_prefix,
+            metadata=metadata,
+        )
+
+    @override
+    def declare_input(
+        self,
+        artifact: AeromancyArtifact | str,
+        use_as: str | None = None,
+    ) -> Sequence[Path]:
+        return self._tracker.declare_input(artifact, use_as)
+
+    @override
+    def declare_input_streaming(
+        self,
+        artifact: AeromancyArtifact | str,
+        use_as: str | None = None,
+    ) -> Iterator[Path]:
+        return self._tracker.declare_input_streaming(artifact, use_as)
+
+    @override
+    def log(self, metrics: dict[str, Any]) -> None:
+        # Copy since the caller may reuse their dictionary.
+        self._metrics_queue.put(dict(metrics))
+
 
 class Action:
     """A specific piece of work to track.
@@ -14,14 +133,36 @@ class Action:
 
     - `job_type`
     - `job_group`
+    - `max_parallel_group`
 
     (`job_group` is more general than `job_type`. Semantics are up to the
     project design and `Tracker` backend.)
+
+    When running with multiple workers, `Action`s which share a
+    `max_parallel_group` (e.g., "gpu") will not be run at the same time as each
+    other. This is useful for `Action`s which compete for a limited resource.
     """
 
+    # Projects may create many Actions, so avoid a per-instance __dict__.
+    # Subclasses which don't declare __slots__ still get one for their own
+    # attributes.
+    __slots__ = (
+        "_fingerprint_cache",
+        "_io_cache",
+        "_outputs_cache",
+        "_project_name",
+        "_skip",
+        "_tags",
+        "_task_deps_cache",
+        "_tracker_class",
+        "config",
+        "parents",
+    )
+
     # Properties for subclasses to fill in.
     job_type: str | None = None
     job_group: str | None = None
+    max_parallel_group: str | None = None
 
     def __init__(self, parents: list["Action"], **config):
         """Create an `Action`.
@@ -40,6 +181,10 @@ class Action:
         self._tracker_class = WandbTracker
         self._project_name = None
         self._tags = None
+        self._outputs_cache: list[str] | None = None
+        self._io_cache: dict[bool, tuple[list[str], list[str]]] = {}
+        self._fingerprint_cache: str | None = None
+        self._task_deps_cache: list[str] | None = None
 
     def outputs(self) -> list[str]:
         """Describe what this `Action` will produce after being run.
@@ -52,6 +197,37 @@ class Action:
         """
         raise NotImplementedError
 
+    def cached_outputs(self) -> list[str]:
+        """Return the result of `outputs()`, only calling it the first time.
+
+        `outputs()` should only depend on state set when the `Action` was
+        created (e.g., its config), so its result can be reused. Callers should
+        not modify the returned list.
+
+        Returns
+        -------
+            List of artifact names that this `Action` will produce.
+        """
+        if self._outputs_cache is None:
+            self._outputs_cache = self.outputs()
+        return self._outputs_cache
+
+    def task_deps(self) -> list[str]:
+        """Return the outputs of all parent `Action`s.
+
+        These are computed once and reused. Callers should not modify the
+        returned list.
+
+        Returns
+        -------
+            List of artifact names that this `Action`'s parents will produce.
+        """
+        if self._task_deps_cache is None:
+            self._task_deps_cache = [
+                output for parent in self.parents for output in parent.cached_outputs()
+            ]
+        return self._task_deps_cache
+
     def run(self, tracker: Tracker) -> None:
         """Execute this action.
 
@@ -84,7 +260,14 @@ class Action:
             project_name=self._project_name,
             tags=self._tags,
         ) as tracker:
-            self.run(tracker)
+            logging_tracker = _BackgroundLoggingTracker(tracker)
+            try:
+                self.run(logging_tracker)
+            finally:
+                # All metrics must be sent before the tracker finishes.
+                log_error = logging_tracker.close()
+            if log_error is not None:
+                raise log_error
 
     def get_io(self, resolve_outputs=False) -> tuple[list[str], list[str]]:
         """Get inputs and outputs for this `Action`.
@@ -98,26 +281,68 @@ class Action:
         -------
             Tuple with names of (input artifacts, output artifacts)
         """
-        parent_outputs = []
-        for parent in self.parents:
-            parent_outputs.extend(parent.outputs())
+        if resolve_outputs in self._io_cache:
+            full_inputs, full_outputs = self._io_cache[resolve_outputs]
+            return (list(full_inputs), list(full_outputs))
+
+        if not self.parents and not resolve_outputs:
+            # Common case for leaf Actions: nothing needs resolving.
+            return ([], list(self.cached_outputs()))
+
+        resolve = WandbArtifactName.resolve_artifact_name
+        project_name = self._project_name
         full_inputs = [
-            WandbArtifactName.resolve_artifact_name(
-                artifact_name,
-                default_project_name=self._project_name,
-            )
-            for artifact_name in parent_outputs
+            resolve(artifact_name, project_name) for artifact_name in self.task_deps()
         ]
-        full_outputs = self.outputs()
+        full_outputs = list(self.cached_outputs())
         if resolve_outputs:
             full_outputs = [
-                WandbArtifactName.resolve_artifact_name(
-                    artifact_name,
-                    default_project_name=self._project_name,
-                )
-                for artifact_name in full_outputs
+                resolve(artifact_name, project_name) for artifact_name in full_outputs
             ]
-        return (full_inputs, full_outputs)
+        self._io_cache[resolve_outputs] = (full_inputs, full_outputs)
+        return (list(full_inputs), list(full_outputs))
+
+    def _fingerprint(self) -> str | None:
+        """Summarize everything that determines the results of this `Action`.
+
+        This covers the `Action` class, its config, its (resolved) input and
+        output artifact names, the code version, and the fingerprints of its
+        parents (so changes upstream change this too).
+
+        Returns
+        -------
+            Hex digest which changes whenever any of the above change, or None
+            if the config includes values we can't reliably summarize.
+        """
+        if self._fingerprint_cache is None:
+            runtime_environment = get_runtime_environment()
+            inputs, outputs = self.get_io(resolve_outputs=True)
+            summary = [
+                f"{self.__class__.__module__}.{self.__class__.__qualname__}",
+                self.config,
+                inputs,
+                outputs,
+                runtime_environment.git_commit_hash,
+                runtime_environment.docker_hash,
+                [parent._fingerprint() for parent in self.parents],
+            ]
+            try:
+                encoded = msgspec.json.encode(
+                    summary,
+                    enc_hook=_fingerprint_enc_hook,
+                    order="deterministic",
+                )
+            except TypeError as type_error:
+                logger.warning(
+                    f"{self.__class__.__qualname__} will always be run: {type_error}",
+                )
+                self._fingerprint_cache = _NO_FINGERPRINT
+            else:
+                self._fingerprint_cache = hashlib.blake2b(
+                    encoded,
+                    digest_size=16,
+                ).hexdigest()
+        return self._fingerprint_cache or None
 
     def _set_tracker(self, tracker_class: type[Tracker]) -> None:
         """Set a different class to use for tracking.
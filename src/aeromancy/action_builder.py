@@ -1,9 +1,55 @@
 """Build a computation graph over Action objects."""
 
+from collections import defaultdict, deque
+
 from .action import Action
 from .action_runner import ActionRunner, ActionType
 
 
+def _topological_sort(actions: list[Action]) -> list[Action]:
+    """Order `actions` so that every `Action` comes after its parents.
+
+    Uses Kahn's algorithm. The original order is kept as much as possible.
+    Parents which aren't in `actions` don't affect the order.
+
+    Parameters
+    ----------
+    actions
+        `Action`s to sort.
+
+    Returns
+    -------
+        The same `Action`s, with parents before children.
+
+    Raises
+    ------
+    ValueError
+        If the dependencies between `actions` form a cycle.
+    """
+    action_set = set(actions)
+    children_by_parent: dict[Action, list[Action]] = defaultdict(list)
+    num_parents_left: dict[Action, int] = {}
+    for action in actions:
+        parents = [parent for parent in action.parents if parent in action_set]
+        num_parents_left[action] = len(parents)
+        for parent in parents:
+            children_by_parent[parent].append(action)
+
+    ready = deque(action for action in actions if not num_parents_left[action])
+    sorted_actions = []
+    while ready:
+        action = ready.popleft()
+        sorted_actions.append(action)
+        for child in children_by_parent[action]:
+            num_parents_left[child] -= 1
+            if not num_parents_left[child]:
+                ready.append(child)
+
+    if len(sorted_actions) != len(actions):
+        raise ValueError("Dependencies between Actions contain a cycle.")
+    return sorted_actions
+
+
 class ActionBuilder:
     """Sets up and runs (via pydoit) a computation graph over `Action`s.
 
@@ -70,6 +116,8 @@ class ActionBuilder:
             The `Action` passed as `action`, with additional run state added
         """
         action._set_buildtime_properties(self._project_name, skip=skip)
+        # Parents have already been added, so their outputs are known.
+        action.task_deps()
         actions.append(action)
         return action
 
@@ -81,4 +129,7 @@ class ActionBuilder:
             An `ActionRunner` which can run the `Actions` specified in
             `build_actions` using pydoit.
         """
-        return ActionRunner(self.build_actions())
+        return ActionRunner(
+            _topological_sort(self.build_actions()),
+            project_name=self._project_name,
+        )
@@ -1,26 +1,134 @@
 """Execute a computation graph over Action objects using pydoit."""
 
-import tempfile
+import contextlib
+import hashlib
+import io
+import multiprocessing
+import os
+import re
+import subprocess
 import typing
+import uuid
+from multiprocessing.managers import AcquirerProxy
 
-import pydot
-import term_image.image
+import msgspec
 from doit.cmd_base import TaskLoader2
+from doit.dependency import UptodateCalculator
 from doit.doit_cmd import DoitMain
 from doit.reporter import ConsoleReporter
 from doit.task import Task as DoitTask
 from rich import print as rich_print
-from rich.console import Console
+from rich.console import Console, Group
+from rich.rule import Rule
 from typing_extensions import override
 
 from .action import Action
 from .fake_tracker import FakeTracker
-from .runtime_environment import get_runtime_environment
+from .runtime_environment import AEROMANCY_STATE_DIR, get_runtime_environment
 
 console = Console()
 
 ActionType = typing.TypeVar("ActionType", bound=Action)
 
+# Where pydoit records which actions have already run. Each project gets its
+# own database so projects don't need to scan (or contend over) each other's
+# entries.
+DOIT_DEP_DIR = AEROMANCY_STATE_DIR / "doit"
+
+# Where rendered dependency graphs (for --graph) are cached. Only the most
+# recently used ones are kept.
+GRAPH_CACHE_DIR = AEROMANCY_STATE_DIR / "graphs"
+MAX_CACHED_GRAPHS = 16
+
+
+def _run_action(
+    action: Action,
+    semaphore: contextlib.AbstractContextManager | None = None,
+) -> str:
+    """Run an `Action`, waiting for its `max_parallel_group` to be free (if any).
+
+    Parameters
+    ----------
+    action
+        `Action` to run.
+    semaphore, optional
+        If set, held while running `action` so that other `Action`s in its
+        `max_parallel_group` don't run at the same time.
+
+    Returns
+    -------
+        A token which is unique to this run. pydoit stores it as the task's
+        result so that `_ActionUpToDate` can tell when a parent has run again.
+    """
+    if semaphore is None:
+        action._run()
+    else:
+        with semaphore:
+            action._run()
+    return uuid.uuid4().hex
+
+
+class _ActionUpToDate(UptodateCalculator):
+    """pydoit `uptodate` check for whether an `Action` needs to be run again.
+
+    An `Action` is up to date if it last succeeded with the same fingerprint and
+    none of its parents have run since then. Parents can run again without
+    changing their fingerprints (e.g., with `--only`), which may still change
+    their outputs.
+    """
+
+    # Key for our state in pydoit's saved values for each task.
+    values_key = "_aeromancy_state"
+
+    def __init__(
+        self,
+        fingerprint: str | None,
+        parent_task_names: list[str],
+        force_run: bool = False,
+    ):
+        """Create the check.
+
+        Parameters
+        ----------
+        fingerprint
+            The `Action`'s fingerprint. If None, it's always run.
+        parent_task_names
+            Names of the pydoit tasks for the `Action`'s parents.
+        force_run, optional
+            If True, the `Action` is run regardless. Its state is still saved,
+            so later runs can tell whether it's up to date.
+        """
+        UptodateCalculator.__init__(self)
+        self.fingerprint = fingerprint
+        self.parent_task_names = parent_task_names
+        self.force_run = force_run
+        self._state: str | None = None
+
+    def configure_task(self, task: DoitTask) -> None:
+        """Save our state whenever the task succeeds (called by pydoit)."""
+        task.value_savers.append(lambda: {self.values_key: self._state})
+
+    def __call__(self, task: DoitTask, values: dict) -> bool:
+        """Whether the task is up to date (called by pydoit)."""
+        if self.fingerprint is None:
+            return False
+
+        # Parents have already run (if needed) by the time we're checked, so
+        # these are the tokens from their latest successful runs.
+        parent_run_tokens = [
+            self.get_val(parent_task_name, "result:")
+            for parent_task_name in self.parent_task_names
+        ]
+        self._state = hashlib.blake2b(
+            msgspec.json.encode([self.fingerprint, parent_run_tokens]),
+            digest_size=16,
+        ).hexdigest()
+        return not self.force_run and values.get(self.values_key) == self._state
+
+    def __repr__(self) -> str:
+        """Describe this check (pydoit shows this when explaining reruns)."""
+        return f"{self.__class__.__name__}({self.fingerprint!r})"
+
 
 def task_to_rich_markup(task: DoitTask):
     """Format a pydoit task for Rich Console."""
@@ -29,18 +137,29 @@ def task_to_rich_markup(task: DoitTask):
 
 
 class RichConsoleReporter(ConsoleReporter):
-    """Logs pydoit events using Rich Console."""
+    """Logs pydoit events using Rich Console.
+
+    Skipped tasks tend to arrive in large bursts, so their rules are buffered
+    and printed together just before the next other event (or at the end of
+    the run). Other events are printed immediately so they always appear
+    before any output from the task itself.
+    """
+
+    @override
+    def __init__(self, outstream, options):
+        ConsoleReporter.__init__(self, outstream, options)
+        self._pending_rules: list[Rule] = []
 
-    def _draw_rule(
+    def _make_rule(
         self,
         emoji: str,
         line_color: str,
         message: str,
         task: DoitTask,
         message_style: str | None = None,
-    ):
+    ) -> Rule:
         message_style = line_color if message_style is None else message_style
-        console.rule(
+        return Rule(
             f"{emoji}[{line_color}] ─── [/{line_color}]"
             f"[{message_style}]{message}[/{message_style}] "
             + task_to_rich_markup(task),
@@ -48,6 +167,15 @@ class RichConsoleReporter(ConsoleReporter):
             align="left",
         )
 
+    def _flush_pending_rules(self):
+        if self._pending_rules:
+            console.print(Group(*self._pending_rules))
+            self._pending_rules.clear()
+
+    def _draw_rule(self, **rule_kwargs):
+        self._flush_pending_rules()
+        console.print(self._make_rule(**rule_kwargs))
+
     @override
     def execute_task(self, task: DoitTask):
         self._draw_rule(
@@ -59,12 +187,14 @@ class RichConsoleReporter(ConsoleReporter):
 
     @override
     def skip_uptodate(self, task: DoitTask):
-        self._draw_rule(
-            emoji="⏭️ ",  # Needs an extra space Because Unicode(tm).
-            line_color="yellow",
-            message_style="yellow italic",
-            message="Skipped",
-            task=task,
+        self._pending_rules.append(
+            self._make_rule(
+                emoji="⏭️ ",  # Needs an extra space Because Unicode(tm).
+                line_color="yellow",
+                message_style="yellow italic",
+                message="Skipped",
+                task=task,
+            ),
         )
 
     @override
@@ -76,6 +206,11 @@ class RichConsoleReporter(ConsoleReporter):
             task=task,
         )
 
+    @override
+    def complete_run(self):
+        self._flush_pending_rules()
+        ConsoleReporter.complete_run(self)
+
 
 class ActionRunner(TaskLoader2):
     """Bridge between ActionBuilder and pydoit.
@@ -85,43 +220,78 @@ class ActionRunner(TaskLoader2):
     pydoit.
     """
 
-    def __init__(self, actions: list[Action]):
+    def __init__(self, actions: list[Action], project_name: str | None = None):
         """Create a runner for already constructed `Action`s.
 
         Parameters
         ----------
         actions
             `Action`s to run.
+        project_name, optional
+            The project that `actions` live in. This determines where records
+            of previously run `Action`s are stored.
         """
         self.actions = actions
-        self.job_name_filter = None
-        self.job_tags = set()
+        self.project_name = project_name
+        self._job_name_filter = None
+        self._job_tags = set()
+        self._parallel_group_semaphores: dict[str, AcquirerProxy] = {}
+        self._tasks_cache: list[DoitTask] | None = None
+
+    @property
+    def job_name_filter(self) -> typing.Callable[[str], bool] | None:
+        """If set, a function which determines whether a job should be run."""
+        return self._job_name_filter
+
+    @job_name_filter.setter
+    def job_name_filter(self, job_name_filter: typing.Callable[[str], bool] | None):
+        self._job_name_filter = job_name_filter
+        # Tasks depend on the filter, so they'll need to be rebuilt.
+        self._tasks_cache = None
+
+    @property
+    def job_tags(self) -> set[str] | None:
+        """Tags to apply to all jobs launched."""
+        return self._job_tags
+
+    @job_tags.setter
+    def job_tags(self, job_tags: set[str] | None):
+        self._job_tags = job_tags
+        # Tasks depend on the tags, so they'll need to be rebuilt.
+        self._tasks_cache = None
 
     @override
     def load_doit_config(self):
+        dep_file = DOIT_DEP_DIR.expanduser() / f"{self.project_name or 'default'}.db"
+        dep_file.parent.mkdir(parents=True, exist_ok=True)
         # verbosity=2 makes doit not mess with stdout/stderr.
         return {
             "verbosity": 2,
             "reporter": RichConsoleReporter,
+            "dep_file": str(dep_file),
         }
 
     @override
     def load_tasks(self, **unused) -> list[DoitTask]:
-        tasks = []
-        for action in self.actions:
-            action._set_runtime_properties(tags=self.job_tags)
-            tasks.append(self._convert_action_to_doittask(action))
+        if self._tasks_cache is None:
+            dev_mode = get_runtime_environment().dev_mode
+            tasks = []
+            for action in self.actions:
+                action._set_runtime_properties(tags=self.job_tags)
+                tasks.append(self._convert_action_to_doittask(action, dev_mode))
+            self._tasks_cache = tasks
 
-        return tasks
+        return list(self._tasks_cache)
 
     def _convert_action_to_doittask(
         self,
         action: Action,
+        dev_mode: bool,
     ) -> DoitTask:
-        if get_runtime_environment().dev_mode:
+        if dev_mode:
             action._set_tracker(FakeTracker)
 
-        outputs = action.outputs()
+        outputs = action.cached_outputs()
         skip = action.skip
 
         if self.job_name_filter is not None:
@@ -129,19 +299,43 @@ class ActionRunner(TaskLoader2):
             # Filter overrides normal skip settings.
             skip = not self.job_name_filter(description)
 
-        task_deps = []
-        for parent in action.parents:
-            task_deps.extend(parent.outputs())
+        task_deps = list(action.task_deps())
+        if skip:
+            uptodate = [True]
+        elif dev_mode:
+            # In --dev mode, code may have changed without a new commit, so we
+            # can't tell whether earlier results are still valid.
+            uptodate = [False]
+        else:
+            # Only rerun if something affecting the action's results changed
+            # (or a parent ran again) since it last succeeded. Actions that were
+            # explicitly requested always run.
+            uptodate = [
+                _ActionUpToDate(
+                    action._fingerprint(),
+                    task_deps,
+                    force_run=self.job_name_filter is not None,
+                ),
+            ]
 
         doit_task = DoitTask(
             name=outputs[0],
             doc=action.job_type,
-            actions=[action._run],
+            actions=[
+                (
+                    _run_action,
+                    [
+                        action,
+                        self._parallel_group_semaphores.get(action.max_parallel_group),
+                    ],
+                ),
+            ],
             task_dep=task_deps,
-            uptodate=[skip],
+            uptodate=uptodate,
             meta={
                 "job_type": action.job_type,
-                "outputs": action.outputs(),
+                "outputs": outputs,
+                "skip": skip,
             },
             io={"capture": False},  # doit shouldn't mess with stdin, etc.
         )
@@ -156,27 +350,77 @@ class ActionRunner(TaskLoader2):
 
         return doit_task
 
-    def _draw_graph(self):
-        dot = pydot.Dot(resolution=300)
-        for task in self.load_tasks():
-            up_to_date = task.uptodate[0][0]
+    @staticmethod
+    def _render_graph(tasks: list[DoitTask]) -> bytes:
+        """Render the dependency graph for `tasks` as PNG bytes."""
+
+        def quote(text: str) -> str:
+            escaped = text.replace("\\", "\\\\").replace('"', '\\"')
+            return f'"{escaped}"'
+
+        # Write DOT directly rather than building up an object per node and edge.
+        lines = ["digraph G {", "resolution=300;"]
+        for task in tasks:
+            skip = task.meta["skip"]  # type: ignore
             job_type = task.meta["job_type"]  # type: ignore
-            label = f"{job_type} | {task.name}"
-            dot.add_node(
-                pydot.Node(
-                    task.name,
-                    label=label,
-                    shape="record",
-                    fontname="Sans-Serif",
-                    color="yellow" if up_to_date else "green",
-                ),
+            label = quote(f"{job_type} | {task.name}")
+            color = "yellow" if skip else "green"
+            lines.append(
+                f"{quote(task.name)} [label={label}, shape=record, "
+                f'fontname="Sans-Serif", color={color}];',
             )
-            for parent in task.task_dep:
-                dot.add_edge(pydot.Edge(parent, task.name))
+            lines.extend(
+                f"{quote(parent)} -> {quote(task.name)};" for parent in task.task_dep
+            )
+        lines.append("}")
+
+        # Render in memory rather than round-tripping through a temporary file.
+        return subprocess.run(
+            ["dot", "-Tpng"],  # noqa: S607
+            input="\n".join(lines).encode(),
+            capture_output=True,
+            check=True,
+        ).stdout
+
+    def _graph_png(self) -> bytes:
+        """Render our dependency graph as PNG bytes, reusing cached renderings."""
+        tasks = self.load_tasks()
+
+        # Rendering is slow for large graphs, so reuse earlier renderings of
+        # identical graphs.
+        graph_summary = [(task.name, task.meta, task.task_dep) for task in tasks]
+        graph_hash = hashlib.sha1(
+            msgspec.json.encode(graph_summary),
+            usedforsecurity=False,
+        ).hexdigest()
+        cache_dir = GRAPH_CACHE_DIR.expanduser()
+        cached_png_path = cache_dir / f"{graph_hash}.png"
+        if cached_png_path.exists():
+            dot_png_bytes = cached_png_path.read_bytes()
+            # Mark as recently used.
+            cached_png_path.touch()
+        else:
+            dot_png_bytes = self._render_graph(tasks)
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            cached_png_path.write_bytes(dot_png_bytes)
+
+            stale_png_paths = sorted(
+                cache_dir.glob("*.png"),
+                key=lambda path: path.stat().st_mtime,
+                reverse=True,
+            )[MAX_CACHED_GRAPHS:]
+            for stale_png_path in stale_png_paths:
+                stale_png_path.unlink(missing_ok=True)
+        return dot_png_bytes
+
+    def _draw_graph(self):
+        dot_png_bytes = self._graph_png()
+
+        import PIL.Image
+        import term_image.image
 
-        with tempfile.NamedTemporaryFile(suffix=".png") as dot_png_file:
-            dot.write(dot_png_file.name, format="png")
-            deps_image = term_image.image.from_file(dot_png_file.name)
+        with PIL.Image.open(io.BytesIO(dot_png_bytes)) as dot_png_image:
+            deps_image = term_image.image.AutoImage(dot_png_image)
             deps_image.draw()
 
     def _list_actions(self):
@@ -189,6 +433,7 @@ class ActionRunner(TaskLoader2):
         graph: bool,
         list_actions: bool,
         tags: set[str] | None,
+        workers: int = 1,
         **unused_kwargs,
     ):
         """Run the stored `Action`s using pydoit.
@@ -205,19 +450,20 @@ class ActionRunner(TaskLoader2):
             If True, show a list of action names and exit.
         tags
             If set, a comma-separated list of tags to apply to all jobs launched.
+        workers, optional
+            Maximum number of `Action`s to run at once (in separate processes).
+            `Action`s still wait for their parents to finish. If 0, use one
+            worker per CPU.
         unused_kwargs
             Should not be used -- this is here as part of some Click hackery to
             show all options in the help menu.
         """
         if only:
-
-            def job_name_filter(job_name):
-                for job_name_substring in only:
-                    if job_name_substring.strip() in job_name:
-                        return True
-                return False
-
-            self.job_name_filter = job_name_filter
+            # Match all substrings in a single pass over each job name.
+            only_pattern = re.compile(
+                "|".join(re.escape(substring.strip()) for substring in sorted(only)),
+            )
+            self.job_name_filter = lambda job_name: bool(only_pattern.search(job_name))
 
         if graph:
             self._draw_graph()
@@ -236,5 +482,30 @@ class ActionRunner(TaskLoader2):
                 characters="⚠️  ",
             )
 
-        # Launch pydoit.
-        DoitMain(self).run([])
+        if workers == 0:
+            workers = os.cpu_count() or 1
+
+        doit_args = []
+        groups = set()
+        if workers > 1:
+            doit_args = ["--process", str(workers), "--parallel-type", "process"]
+            groups = {action.max_parallel_group for action in self.actions} - {None}
+        if not groups:
+            DoitMain(self).run(doit_args)
+            return
+
+        # Semaphores keep `Action`s sharing a `max_parallel_group` from running at
+        # the same time. Proxies for a manager's semaphores are passed to the
+        # workers with each task, so this works whether workers are forked or
+        # spawned (the default on macOS).
+        with multiprocessing.Manager() as manager:
+            self._parallel_group_semaphores = {
+                group: manager.BoundedSemaphore() for group in sorted(groups)
+            }
+            # Tasks include the semaphores, so they'll need to be rebuilt.
+            self._tasks_cache = None
+            try:
+                DoitMain(self).run(doit_args)
+            finally:
+                self._parallel_group_semaphores = {}
+                self._tasks_cache = None
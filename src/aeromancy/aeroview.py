@@ -10,26 +10,101 @@ or:
 """
 
 import subprocess
+import typing
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import hyperlink
-import pandas as pd
 import rich_click as click
-import skops.io
-import wandb
 from rich import inspect, print
 from rich.console import Console
 
-from .artifacts import AeromancyArtifact
 from .s3 import S3Client, VersionedS3Object
 
+# Heavy modules are imported only when a viewer needs them, which keeps startup
+# fast for simple cases (e.g., YAML files).
+if typing.TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
 CLICK_CONTEXT_SETTINGS = {"help_option_names": ["-h", "--help"]}
 console = Console()
 
+# Maximum number of artifact files to download at once.
+MAX_FETCH_WORKERS = 8
+
+# Number of rows to show from tabular artifacts.
+HEAD_ROWS = 5
+
+
+def describe_table(table: "pa.Table") -> "pd.DataFrame":
+    """Summarize the numeric columns in an Arrow table.
+
+    This is a lighter-weight version of `pd.DataFrame.describe` which is
+    computed directly on the Arrow columns, so the table never needs to be
+    converted to pandas.
+
+    Parameters
+    ----------
+    table
+        Arrow table to summarize.
+
+    Returns
+    -------
+        A DataFrame with a column for each numeric column in `table` and a row
+        for each statistic.
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    summaries = {}
+    for name, column in zip(table.column_names, table.columns, strict=True):
+        if not (pa.types.is_integer(column.type) or pa.types.is_floating(column.type)):
+            continue
+        min_max = pc.min_max(column)
+        # Linear interpolation (the default) matches pandas.
+        quartiles = pc.quantile(column, q=[0.25, 0.5, 0.75]).to_pylist()
+        summaries[name] = {
+            "count": len(column) - column.null_count,
+            "mean": pc.mean(column).as_py(),
+            "std": pc.stddev(column, ddof=1).as_py(),
+            "min": min_max["min"].as_py(),
+            "25%": quartiles[0],
+            "50%": quartiles[1],
+            "75%": quartiles[2],
+            "max": min_max["max"].as_py(),
+        }
+    return pd.DataFrame(summaries)
+
+
+def view_feather(local_path: Path) -> None:
+    """Display a summary of a Feather file without loading it into pandas.
+
+    Parameters
+    ----------
+    local_path
+        Path to the Feather file.
+    """
+    import pyarrow.feather
+
+    table = pyarrow.feather.read_table(local_path, memory_map=True)
+    print("[bold]Head:[/bold]")
+    print(table.slice(0, HEAD_ROWS).to_pandas())
+    print()
+    print("[bold]Described:[/bold]")
+    print(describe_table(table))
+    print()
+    print("[bold]Info:[/bold]")
+    print(f"{table.num_rows} rows, {table.num_columns} columns")
+    for name, column in zip(table.column_names, table.columns, strict=True):
+        print(f"  {name}: {column.type} ({column.null_count} nulls)")
+
 
 def view_aeromancy_uri(
     aeromancy_uri: hyperlink.URL | hyperlink.DecodedURL,
     s3_client: S3Client,
+    local_path: Path | None = None,
 ) -> None:
     """Interactively view an Aeromancy artifact.
 
@@ -39,33 +114,39 @@ def view_aeromancy_uri(
         Aeromancy URI (i.e., with "aeromancy://" scheme)
     s3_client
         An S3 client to look up artifact files.
+    local_path, optional
+        Local copy of the artifact, if it has already been fetched.
     """
     console.rule(f"URI: {aeromancy_uri}")
 
     s3 = VersionedS3Object.from_aeromancy_uri(aeromancy_uri)
-    local_path = s3_client.fetch(s3)
     real_filename = Path(*aeromancy_uri.path)
+    if real_filename.suffix == ".yaml":
+        # Small enough to pipe straight to bat rather than caching to disk first.
+        body = (
+            s3_client.fetch_bytes(s3) if local_path is None else local_path.read_bytes()
+        )
+        subprocess.run(
+            [  # noqa: S607
+                "bat",
+                "--language",
+                "yaml",
+                "--file-name",
+                str(real_filename),
+            ],
+            input=body,
+            check=True,
+        )
+        return
+
+    if local_path is None:
+        local_path = s3_client.fetch(s3)
     match real_filename.suffix:
-        case ".yaml":
-            subprocess.check_call(
-                [  # noqa: S607
-                    "bat",
-                    local_path,
-                    "--file-name",
-                    real_filename,
-                ],
-            )
         case ".feather":
-            artifact_df = pd.read_feather(local_path)
-            print("[bold]Head:[/bold]")
-            print(artifact_df.head())
-            print()
-            print("[bold]Described:[/bold]")
-            print(artifact_df.describe())
-            print()
-            print("[bold]Info:[/bold]")
-            artifact_df.info()
+            view_feather(local_path)
         case ".skops":
+            import skops.io
+
             skops.io.visualize(local_path)
         case _:
             console.log(f"No viewer for {real_filename.suffix} files.")
@@ -85,6 +166,10 @@ def main(artifact_full_name: str) -> None:
         aeromancy_uri = hyperlink.parse(artifact_full_name)
         view_aeromancy_uri(aeromancy_uri, s3_client)
     else:
+        import wandb
+
+        from .artifacts import AeromancyArtifact
+
         wandb_api = wandb.Api()
         wandb_api_artifact = wandb_api.artifact(artifact_full_name)
         inspect(wandb_api_artifact)
@@ -93,8 +178,11 @@ def main(artifact_full_name: str) -> None:
         )
         if len(aeromancy_artifact.s3) > 1:
             console.log(f"{len(aeromancy_artifact.s3)} entries in manifest:")
-        for s3 in aeromancy_artifact.s3:
-            view_aeromancy_uri(s3.to_aeromancy_uri(), s3_client)
+        # Download everything up front in parallel, then display in order.
+        with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as executor:
+            local_paths = list(executor.map(s3_client.fetch, aeromancy_artifact.s3))
+        for s3, local_path in zip(aeromancy_artifact.s3, local_paths, strict=True):
+            view_aeromancy_uri(s3.to_aeromancy_uri(), s3_client, local_path)
 
 
 if __name__ == "__main__":
@@ -4,29 +4,60 @@ This is effectively a bridge between Weights and Biases artifacts and S3-backed
 version objects.
 """
 
+import functools
 import re
-from collections.abc import Sequence
+import string
+import sys
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import TYPE_CHECKING, TypeVar
 
 import hyperlink
 import msgspec
-import wandb
-import wandb.errors
-import wandb.sdk.wandb_run
 from loguru import logger
-from wandb.sdk.artifacts.artifact import Artifact as WandbApiArtifact
-from wandb.sdk.wandb_run import Run as WandbRun
 
 from .runtime_environment import get_runtime_environment
 from .s3 import (
+    MAX_CONNECTIONS,
     S3Client,
     S3Object,
     VersionedS3Object,
 )
 
+if TYPE_CHECKING:
+    # wandb is slow to import, so it's only imported where it's actually used.
+    import wandb
+    from wandb.sdk.artifacts.artifact import Artifact as WandbApiArtifact
+    from wandb.sdk.wandb_run import Run as WandbRun
+
 # This is subject to change, of course, but there doesn't seem to be an exported
 # constant from wandb that we can use.
-VALID_WANDB_ARTIFACT_NAME_RE = re.compile(r"^[a-zA-Z0-9_\-.]+$")
+VALID_WANDB_ARTIFACT_NAME_CHARS = string.ascii_letters + string.digits + "_-."
+
+# Deletes all valid characters, so only invalid ones are left after translating.
+_DELETE_VALID_CHARS = str.maketrans("", "", VALID_WANDB_ARTIFACT_NAME_CHARS)
+
+# Splits "[[entity/]project/]name[:version]". Pieces are validated separately.
+# The name is matched lazily so only the last colon starts the version.
+_WANDB_ARTIFACT_NAME_PARTS_RE = re.compile(
+    r"(?:(?:(?P<entity>[^/]*)/)?(?P<project>[^/]*)/)?"
+    r"(?P<artifact_name>[^/]*?)(?::(?P<version>[^/:]*))?",
+)
+
+# Weights and Biases version strings which always refer to the same contents
+# (unlike aliases such as "latest").
+_IMMUTABLE_VERSION_RE = re.compile(r"v\d+")
+
+# Maximum number of files to upload to or download from S3 at once.
+MAX_TRANSFER_WORKERS = MAX_CONNECTIONS
+
+_TransferItem = TypeVar("_TransferItem")
+_TransferResult = TypeVar("_TransferResult")
+
+# Cache for WandbArtifactName.resolve_artifact_name(), keyed by its arguments and
+# the artifact overrides in effect.
+_resolved_artifact_names: dict[tuple[str, str | None, tuple[str, ...]], str] = {}
 
 
 def _validate_wandb_artifact_string(name: str | None, role: str):
@@ -58,17 +89,39 @@ def _validate_wandb_artifact_string(name: str | None, role: str):
     if name is None:
         return
 
-    if not VALID_WANDB_ARTIFACT_NAME_RE.match(name):
+    if not name or name.translate(_DELETE_VALID_CHARS):
         raise ValueError(
             f"Invalid {role} name: {name!r} (can only include alphanumeric "
             "characters, digits, underscores, dashes, and/or dots)",
         )
 
 
-class WandbArtifactName(msgspec.Struct):
+@functools.lru_cache(maxsize=1024)
+def _parse_wandb_artifact_name(
+    cls: type["WandbArtifactName"],
+    wandb_artifact_name: str,
+) -> "WandbArtifactName":
+    """Parse and validate an artifact name. See `WandbArtifactName.parse`.
+
+    `WandbArtifactName`s are immutable, so cached instances can be shared and
+    each distinct string is only validated once.
+    """
+    match = _WANDB_ARTIFACT_NAME_PARTS_RE.fullmatch(wandb_artifact_name)
+    if match is None:
+        raise ValueError(f"Not sure how to parse: {wandb_artifact_name!r}")
+    # Interned so that comparisons between parsed names (e.g., in `matches`)
+    # can usually succeed on identity alone.
+    entity, project, artifact_name, version = (
+        None if piece is None else sys.intern(piece) for piece in match.groups()
+    )
+    return cls(entity, project, artifact_name, version)
+
+
+class WandbArtifactName(msgspec.Struct, frozen=True, gc=False):
     """Represents a parse of a Weights and Biases artifact name.
 
-    Can include None for any missing entries.
+    Can include None for any missing entries. These are immutable, so use
+    `msgspec.structs.replace` to make modified copies.
 
     Attributes
     ----------
@@ -138,29 +191,7 @@ class WandbArtifactName(msgspec.Struct):
         -------
             Instance of `WandbArtifactName` with values from `wandb_artifact_name`
         """
-        project = None
-        entity = None
-        version = None
-
-        pieces = wandb_artifact_name.split("/")
-        # If there's a version, pull it off the last piece.
-        if ":" in pieces[-1]:
-            last_part, version = pieces[-1].rsplit(":", 1)
-            pieces[-1] = last_part
-
-        match len(pieces):
-            case 1:
-                artifact_name = pieces[0]
-            case 2:
-                project, artifact_name = pieces
-            case 3:
-                entity, project, artifact_name = pieces
-            case _:
-                raise ValueError(
-                    f"Not sure how to parse: {wandb_artifact_name!r}",
-                )
-
-        return cls(entity, project, artifact_name, version)
+        return _parse_wandb_artifact_name(cls, wandb_artifact_name)
 
     def matches(self, other_artifact_name: "WandbArtifactName") -> bool:
         """Test whether this and another artifact name are compatible.
@@ -178,6 +209,10 @@ class WandbArtifactName(msgspec.Struct):
         -------
             True if they match.
         """
+        # Artifact names are the most likely to differ, so check them first.
+        if self.artifact_name != other_artifact_name.artifact_name:
+            return False
+
         if (
             self.entity
             and other_artifact_name.entity
@@ -185,27 +220,41 @@ class WandbArtifactName(msgspec.Struct):
         ):
             return False
 
-        if (
+        return not (
             self.project
             and other_artifact_name.project
             and self.project != other_artifact_name.project
-        ):
-            return False
-
-        return self.artifact_name == other_artifact_name.artifact_name
+        )
 
-    def incorporate_overrides(self):
+    def apply_overrides(
+        self,
+        overrides: Sequence["WandbArtifactName"] | None = None,
+    ) -> "WandbArtifactName":
         """Incorporate artifact version overrides.
 
-        If these are set for this artifact via environment variables and we
-        don't already have a specific version set for this artifact, we'll use
-        the overridden version.
+        If these are set for this artifact via environment variables, we'll
+        use the overridden version.
+
+        Parameters
+        ----------
+        overrides, optional
+            Parsed overrides to check. Defaults to those from the current
+            `RuntimeEnvironment`.
+
+        Returns
+        -------
+            A copy of this artifact name using the overridden version, or this
+            artifact name if there's no matching override.
         """
-        for artifact_name in get_runtime_environment().artifact_overrides:
-            parsed_artifact_name = self.__class__.parse(artifact_name)
+        if overrides is None:
+            overrides = get_runtime_environment().parsed_artifact_overrides
+        for parsed_artifact_name in overrides:
             if self.matches(parsed_artifact_name):
-                self.version = parsed_artifact_name.version
-                break
+                return msgspec.structs.replace(
+                    self,
+                    version=parsed_artifact_name.version,
+                )
+        return self
 
     @classmethod
     def resolve_artifact_name(
@@ -238,15 +287,52 @@ class WandbArtifactName(msgspec.Struct):
         -------
             Resolved artifact name as a string.
         """
+        runtime_environment = get_runtime_environment()
+        cache_key = (
+            artifact_name,
+            default_project_name,
+            runtime_environment.artifact_overrides_key,
+        )
+        if cache_key in _resolved_artifact_names:
+            return _resolved_artifact_names[cache_key]
+
         wandb_artifact_name = cls.parse(artifact_name)
         # Fill in some defaults.
-        wandb_artifact_name.project = (
-            wandb_artifact_name.project or default_project_name
-        )
-        wandb_artifact_name.version = wandb_artifact_name.version or "latest"
-        wandb_artifact_name.incorporate_overrides()
+        wandb_artifact_name = msgspec.structs.replace(
+            wandb_artifact_name,
+            project=wandb_artifact_name.project or default_project_name,
+            version=wandb_artifact_name.version or "latest",
+        ).apply_overrides(runtime_environment.parsed_artifact_overrides)
+
+        resolved_artifact_name = str(wandb_artifact_name)
+        _resolved_artifact_names[cache_key] = resolved_artifact_name
+        return resolved_artifact_name
+
+
+class ArtifactMetadata(msgspec.Struct, frozen=True):
+    """Metadata which Aeromancy attaches to each Weights and Biases `Artifact`.
 
-        return str(wandb_artifact_name)
+    This is intended as a debugging aid.
+
+    Attributes
+    ----------
+    primary_s3_key
+        S3 key of the first file in the artifact.
+    primary_s3_bucket
+        S3 bucket of the first file in the artifact.
+    primary_s3_version
+        S3 version of the first file in the artifact.
+    viewer_url
+        URL for viewing the artifact on an S3 viewer webpage.
+    num_files
+        Number of files in the artifact.
+    """
+
+    primary_s3_key: str
+    primary_s3_bucket: str
+    primary_s3_version: str
+    viewer_url: str
+    num_files: int
 
 
 class AeromancyArtifact(msgspec.Struct):
@@ -282,7 +368,7 @@ class AeromancyArtifact(msgspec.Struct):
         _validate_wandb_artifact_string(self.artifact_type, "artifact type")
 
     @classmethod
-    def from_wandb_api_artifact(cls, wandb_api_artifact: WandbApiArtifact):
+    def from_wandb_api_artifact(cls, wandb_api_artifact: "WandbApiArtifact"):
         """Create an `AeromancyArtifact` from a Weights and Biases API artifact.
 
         Parameters
@@ -296,13 +382,16 @@ class AeromancyArtifact(msgspec.Struct):
         -------
             An `AeromancyArtifact` corresponding to `wandb_api_artifact`
         """
+        # Order matters (e.g., the first file is the primary one), so keep it
+        # independent of manifest order. Sorting just the entry names avoids
+        # comparing (name, entry) tuples.
+        entries = wandb_api_artifact.manifest.entries
         s3_objects = []
-        for _, manifest_value in sorted(wandb_api_artifact.manifest.entries.items()):
-            if manifest_value.ref is None:
+        for entry_name in sorted(entries):
+            ref = entries[entry_name].ref
+            if ref is None:
                 raise ValueError("No URI associated with manifest entry")
-            aeromancy_uri = hyperlink.parse(manifest_value.ref)
-            s3 = VersionedS3Object.from_aeromancy_uri(aeromancy_uri)
-            s3_objects.append(s3)
+            s3_objects.append(VersionedS3Object.from_aeromancy_uri_str(ref))
 
         artifact_type = wandb_api_artifact.type
         artifact_name = WandbArtifactName.parse(wandb_api_artifact.name)
@@ -316,7 +405,7 @@ class AeromancyArtifact(msgspec.Struct):
     def as_wandb_artifact(
         self,
         metadata: dict | None = None,
-    ) -> wandb.Artifact:
+    ) -> "wandb.Artifact":
         """Convert this into a Weights and Biases `Artifact`.
 
         Parameters
@@ -330,22 +419,22 @@ class AeromancyArtifact(msgspec.Struct):
             This object represented as a Weights and Biases `Artifact`.
         """
         primary_s3 = self.s3[0]
-        # Metadata here is intended as a debugging aid.
-        # We make a copy since we're going to modify it and the caller doesn't expect it
-        # to change.
-        metadata = dict(metadata or {})
-        metadata.update(
+        aeromancy_metadata = ArtifactMetadata(
             primary_s3_key=primary_s3.key,
             primary_s3_bucket=primary_s3.bucket,
             primary_s3_version=primary_s3.version_id,
-            # For viewing this Artifact on an S3 viewer webpage.
-            viewer_url=self.to_s3_viewer_url(),
+            viewer_url=str(self.to_s3_viewer_url()),
             num_files=len(self.s3),
         )
+        # Weights and Biases needs a plain dict. This builds a new one since the
+        # caller doesn't expect theirs to change.
+        metadata = {**(metadata or {}), **msgspec.to_builtins(aeromancy_metadata)}
 
         description = f"{primary_s3.bucket}/{primary_s3.key}"
         if len(self.s3) > 1:
             description = f"{description} (+{len(self.s3) - 1} others)"
+        import wandb
+
         artifact = wandb.Artifact(
             name=self.name,
             description=description,
@@ -368,10 +457,10 @@ class AeromancyArtifact(msgspec.Struct):
         primary_s3 = self.s3[0]
 
         query = {}
-        key = Path(primary_s3.key)
-        if len(key.parts) > 1:
+        key_parent, _, _ = primary_s3.key.rpartition("/")
+        if key_parent:
             # View the parent directory in DigitalOcean.
-            query = {"path": f"{key.parent}/"}
+            query = {"path": f"{key_parent}/"}
 
         return hyperlink.URL(
             scheme="https",
@@ -388,6 +477,34 @@ class AeromancyArtifact(msgspec.Struct):
 ArtifactDescriptor = AeromancyArtifact | str
 
 
+def _map_transfers(
+    transfer: Callable[[_TransferItem], _TransferResult],
+    items: Iterable[_TransferItem],
+) -> list[_TransferResult]:
+    """Run `transfer` (e.g., an S3 upload) on each item in parallel threads.
+
+    Results are returned in the same order as `items`.
+    """
+    items = list(items)
+    if len(items) <= 1:
+        return [transfer(item) for item in items]
+    max_workers = min(MAX_TRANSFER_WORKERS, len(items))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(transfer, items))
+
+
+@functools.cache
+def _default_wandb_api() -> "wandb.Api":
+    """Create a Weights and Biases API client, shared by all `Artifacts`.
+
+    Creating these isn't free and they're only needed to look up input
+    artifacts by name, so we avoid doing so until needed.
+    """
+    import wandb
+
+    return wandb.Api()
+
+
 class Artifacts:
     """Bridge between Aeromancy and external artifact storage.
 
@@ -397,7 +514,7 @@ class Artifacts:
 
     def __init__(
         self,
-        wandb_run: WandbRun,
+        wandb_run: "WandbRun",
         s3_client: S3Client | None = None,
     ):
         """Construct an `Artifacts` object for a specific Weights and Biases `Run`.
@@ -415,7 +532,13 @@ class Artifacts:
             self._s3 = S3Client.from_env_variables()
 
         self.wandb_run = wandb_run
-        self.wandb_api = wandb.Api()
+        # Input artifacts already looked up by (specifically versioned) name.
+        self._inputs_by_name: dict[str, AeromancyArtifact] = {}
+
+    @property
+    def wandb_api(self) -> "wandb.Api":
+        """Weights and Biases API client, created on first use."""
+        return _default_wandb_api()
 
     def declare_output(
         self,
@@ -461,13 +584,16 @@ class Artifacts:
         if not local_filenames:
             raise ValueError("Need at least 1 item in local_filenames to be an output.")
 
-        s3_objects = []
-        for local_filename in local_filenames:
+        # Need a trailing slash since otherwise we end up with an absolute path.
+        prefix_to_strip = f"{strip_prefix}/" if strip_prefix else None
+
+        def upload(local_filename: Path) -> VersionedS3Object:
             new_path = local_filename
-            if strip_prefix:
-                # Need a trailing slash since otherwise we end up with an absolute path.
-                new_path = str(new_path).removeprefix(str(strip_prefix) + "/")
-            s3_objects.append(self._s3.put(local_filename, s3_destination / new_path))
+            if prefix_to_strip:
+                new_path = str(new_path).removeprefix(prefix_to_strip)
+            return self._s3.put(local_filename, s3_destination / new_path)
+
+        s3_objects = _map_transfers(upload, local_filenames)
         # Upgrade it to an AeromancyArtifact.
         aero_artifact = AeromancyArtifact(
             name=name,
@@ -481,6 +607,8 @@ class Artifacts:
         return aero_artifact
 
     def _try_use_artifact(self, wandb_artifact, use_as):
+        import wandb.errors
+
         try:
             self.wandb_run.use_artifact(wandb_artifact, use_as=use_as)
         except wandb.errors.CommError as comm_error:
@@ -511,16 +639,63 @@ class Artifacts:
         -------
             Returns a local filesystem version of the artifact.
         """
+        artifact = self._use_input(artifact, use_as)
+        local_paths = _map_transfers(self._s3.fetch, artifact.s3)
+        return local_paths
+
+    def declare_input_streaming(
+        self,
+        artifact: ArtifactDescriptor,
+        use_as: str | None = None,
+    ) -> Iterator[Path]:
+        """Like `declare_input`, but yield local paths as soon as they're fetched.
+
+        This lets callers start processing files while the rest are still being
+        fetched. Note that paths are yielded in the order that fetches finish,
+        not the order of files in the artifact. As with any generator, nothing
+        happens (including recording the dependency) until iteration starts.
+
+        Parameters
+        ----------
+        artifact
+            An artifact that our associated Weights and Biases `Run` depends on.
+        use_as, optional
+            Description of how we're using the artifact (e.g., "train", "test").
+
+        Yields
+        ------
+            Local paths to files in the artifact.
+        """
+        artifact = self._use_input(artifact, use_as)
+        max_workers = min(MAX_TRANSFER_WORKERS, max(len(artifact.s3), 1))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self._s3.fetch, s3) for s3 in artifact.s3]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def _use_input(
+        self,
+        artifact: ArtifactDescriptor,
+        use_as: str | None,
+    ) -> AeromancyArtifact:
+        """Record a dependency on `artifact` and resolve it if it's a name."""
         if isinstance(artifact, str):
             self._try_use_artifact(artifact, use_as=use_as)
 
-            api_artifact = self.wandb_api.artifact(artifact)
+            artifact_name = artifact
+            if artifact_name in self._inputs_by_name:
+                return self._inputs_by_name[artifact_name]
+
+            api_artifact = self.wandb_api.artifact(artifact_name)
             if api_artifact.qualified_name != api_artifact.source_qualified_name:
                 logger.info(f"Resolved {api_artifact.name!r} -> {api_artifact.version}")
             artifact = AeromancyArtifact.from_wandb_api_artifact(api_artifact)
+            # Aliases (e.g., "latest") may move, but specific versions never change.
+            version = WandbArtifactName.parse(artifact_name).version
+            if version and _IMMUTABLE_VERSION_RE.fullmatch(version):
+                self._inputs_by_name[artifact_name] = artifact
         else:
             wandb_artifact = artifact.as_wandb_artifact()
             self._try_use_artifact(wandb_artifact, use_as=use_as)
 
-        local_paths = [self._s3.fetch(s3) for s3 in artifact.s3]
-        return local_paths
+        return artifact
@@ -1,6 +1,5 @@
 """Groups of Click options for the main Aeromancy CLI interface."""
 
-import functools
 import shlex
 
 import rich_click as click
@@ -16,6 +15,7 @@ click.rich_click.OPTION_GROUPS = {
                 "--graph",
                 "--list-actions",
                 "--tags",
+                "--workers",
             ],
         },
         {
@@ -42,29 +42,36 @@ def csv_string_to_set(ctx, param, value) -> set[str] | None:
     return None
 
 
-def runner_click_options(function):
-    """Wrap `function` with all Click options for Aeromancy runtime."""
-    # NOTE: Keep in sync with OPTION_GROUPS.
+def _apply_options(function, options):
+    """Attach Click `options` to `function`, keeping them in the listed order."""
+    for option in reversed(options):
+        function = option(function)
+    return function
+
 
-    @click.option(
+# Decorators for each option are created once at import time. Options are
+# attached directly to the decorated function rather than via wrapper functions.
+# NOTE: Keep these in sync with OPTION_GROUPS.
+_RUNNER_OPTIONS = (
+    click.option(
         "--dev",
         is_flag=True,
         help="If set, use development mode for quickly testing changes (don't actually "
         "track anything, or use Weights and Biases, S3, Docker, etc.).",
-    )
-    @click.option(
+    ),
+    click.option(
         "--debug",
         is_flag=True,
         help="Used to aid in Aeromancy debugging. If set, Aeromancy and related tools "
         "(e.g., Docker) will be more verbose.",
-    )
-    @click.option(
+    ),
+    click.option(
         "--debug-shell",
         help="If True, open a debug shell in the Docker container instead of running "
         "Aeromain. Implies --debug.",
         is_flag=True,
-    )
-    @click.option(
+    ),
+    click.option(
         "--extra-docker-run-args",
         default="",
         metavar="ARGS",
@@ -75,8 +82,8 @@ def runner_click_options(function):
         ),
         # Parse a string into a list honoring shell-style quoting.
         callback=lambda ctx, param, value: shlex.split(value),
-    )
-    @click.option(
+    ),
+    click.option(
         "--extra-debian-package",
         "extra_debian_packages",
         metavar="PKG",
@@ -87,8 +94,8 @@ def runner_click_options(function):
             "extra package. You should generally not need to change this, but it may "
             "be set in pdm scripts when setting up a project."
         ),
-    )
-    @click.option(
+    ),
+    click.option(
         "--extra-env-var",
         "extra_env_vars",
         metavar="VAR",
@@ -98,8 +105,8 @@ def runner_click_options(function):
             "option once per variable. You should generally not need to change this, "
             "but it may be set in pdm scripts when setting up a project."
         ),
-    )
-    @click.option(
+    ),
+    click.option(
         "--artifact-override",
         "artifact_overrides",
         metavar="NAMEVER",
@@ -110,8 +117,8 @@ def runner_click_options(function):
             "Biases version."
         ),
         multiple=True,
-    )
-    @click.option(
+    ),
+    click.option(
         "--aeromain",
         "aeromain_path",
         default="src/main.py",
@@ -120,22 +127,11 @@ def runner_click_options(function):
         # to minimize confusion.
         hidden=True,
         help="Set an alternate Aeromain file to run.",
-    )
-    @functools.wraps(function)
-    def wrapper_aeromancy_options(*args, **kwargs):
-        return function(*args, **kwargs)
-
-    return wrapper_aeromancy_options
-
-
-def aeromancy_click_options(function):
-    """Wrap `function` with all Click options for Aeromancy.
-
-    This is intended to wrap an `aeromain` function.
-    """
-    # NOTE: Keep in sync with OPTION_GROUPS.
+    ),
+)
 
-    @click.option(
+_AEROMANCY_OPTIONS = (
+    click.option(
         "-o",
         "--only",
         default=None,
@@ -144,29 +140,46 @@ def aeromancy_click_options(function):
         help="If set: comma-separated list of substrings. We'll only run jobs which "
         "match at least one of these.",
         callback=csv_string_to_set,
-    )
-    @click.option(
+    ),
+    click.option(
         "--graph",
         is_flag=True,
         help="If set: show a graph of job dependencies and exit.",
-    )
-    @click.option(
+    ),
+    click.option(
         "--list-actions",
         "--list",
         is_flag=True,
         help="If set: show a list of all job names and exit.",
-    )
-    @click.option(
+    ),
+    click.option(
         "--tags",
         "tags",
         metavar="TAGS",
         help="Comma-separated tags to add to each task launched. These tags are purely "
         "for organizational purposes.",
         callback=csv_string_to_set,
-    )
-    @runner_click_options
-    @functools.wraps(function)
-    def wrapper_aeromancy_options(*args, **kwargs):
-        return function(*args, **kwargs)
+    ),
+    click.option(
+        "-j",
+        "--workers",
+        default=1,
+        type=click.IntRange(min=0),
+        metavar="N",
+        help="Maximum number of jobs to run in parallel (jobs still wait for the jobs "
+        "they depend on). If 0, use one worker per CPU.",
+    ),
+)
 
-    return wrapper_aeromancy_options
+
+def runner_click_options(function):
+    """Wrap `function` with all Click options for Aeromancy runtime."""
+    return _apply_options(function, _RUNNER_OPTIONS)
+
+
+def aeromancy_click_options(function):
+    """Wrap `function` with all Click options for Aeromancy.
+
+    This is intended to wrap an `aeromain` function.
+    """
+    return _apply_options(function, _AEROMANCY_OPTIONS + _RUNNER_OPTIONS)
@@ -12,9 +12,11 @@ Limitations:
       that were produced in `--dev` mode (or manually transferred to its cache).
 """
 
+import contextlib
 import datetime
-import shutil
-from collections.abc import Sequence
+import mmap
+import os
+from collections.abc import Iterator, Sequence
 from pathlib import Path
 from typing import Any
 
@@ -27,9 +29,20 @@ from typing_extensions import override
 from .artifacts import (
     AeromancyArtifact,
     WandbArtifactName,
+    _map_transfers,
 )
 from .runtime_environment import get_runtime_environment
-from .s3 import Cache, S3Object, VersionedS3Object, file_digest
+from .s3 import (
+    Cache,
+    S3Object,
+    VersionedS3Object,
+    _decode_records,
+    _encode_record,
+    _file_lock,
+    copy_and_digest,
+    fast_copy,
+    file_digest,
+)
 from .tracker import Tracker
 
 console = Console()
@@ -69,6 +82,32 @@ class FakeArtifactMapping(msgspec.Struct):
     artifacts_by_name: dict[str, AeromancyArtifact]
 
 
+class FakeArtifactMappingEntry(msgspec.Struct, frozen=True, array_like=True):
+    """A single record in the on-disk log of `FakeArtifactMapping` updates.
+
+    These are encoded as arrays rather than maps, so field names aren't
+    repeated in every record.
+
+    Attributes
+    ----------
+    name
+        Full name of the artifact.
+    artifact
+        The artifact itself.
+    """
+
+    name: str
+    artifact: AeromancyArtifact
+
+
+# Rewrite the artifact mapping log once it has this many records per artifact.
+MAPPING_COMPACTION_RATIO = 4
+
+# The artifact mapping is a log of `FakeArtifactMappingEntry` records.
+_mapping_encoder = msgspec.msgpack.Encoder()
+_mapping_decoder = msgspec.msgpack.Decoder(FakeArtifactMappingEntry)
+
+
 class FakeTracker(Tracker):
     """Fake Tracker for fast development.
 
@@ -97,33 +136,130 @@ class FakeTracker(Tracker):
 
         self.cache_root_path = Path("~/FakeCache").expanduser().resolve()
         self.cache = Cache(cache_root=self.cache_root_path)
-        self.mapping_path = self.cache_root_path / "artifact_mapping.json"
+        self.mapping_path = self.cache_root_path / "artifact_mapping.msgpack"
+        # Held while appending to or rewriting the artifact mapping log, since
+        # other processes (e.g., parallel workers) may be using it too.
+        self.mapping_lock_path = self.cache_root_path / "artifact_mapping.lock"
         self._read_artifact_mapping()
 
     def _read_artifact_mapping(self):
-        if self.mapping_path.exists():
-            with self.mapping_path.open() as mapping_file:
-                mapping_json = mapping_file.read()
-            mapping = msgspec.json.decode(mapping_json, type=FakeArtifactMapping)
-        else:
-            mapping = FakeArtifactMapping({})
-
+        mapping, needs_rewrite = self._load_artifact_mapping()
+        if needs_rewrite:
+            # Another process may have been partway through appending a record
+            # (which looks like an incomplete one), so read it again once other
+            # processes are locked out.
+            with self._mapping_locked():
+                mapping, needs_rewrite = self._load_artifact_mapping()
+                if needs_rewrite:
+                    self._write_artifact_mapping(mapping)
+                    self.mapping_path.with_suffix(".json").unlink(missing_ok=True)
         self.artifact_mapping = mapping
 
-    def _set_artifact_mapping(self, name, artifact):
-        self.artifact_mapping.artifacts_by_name[str(name)] = artifact
-
-        # Save to disk.
-        jsonified = msgspec.json.encode(self.artifact_mapping)
+    def _load_artifact_mapping(self) -> tuple[FakeArtifactMapping, bool]:
+        """Read the artifact mapping log.
+
+        Returns the mapping and whether the log needs to be rewritten (since it
+        ends with an incomplete record or is still in the older JSON format).
+        """
+        self._num_mapping_entries = 0
+        if not self.mapping_path.exists():
+            return self._load_json_artifact_mapping()
+
+        # Map the file rather than reading it, which saves a copy.
+        with self.mapping_path.open("rb") as mapping_file:
+            mapping_size = os.fstat(mapping_file.fileno()).st_size
+            if mapping_size:
+                with mmap.mmap(
+                    mapping_file.fileno(),
+                    0,
+                    access=mmap.ACCESS_READ,
+                ) as mapped:
+                    entries, num_bytes_used = _decode_records(
+                        _mapping_decoder,
+                        mapped,
+                    )
+            else:
+                entries, num_bytes_used = [], 0
+
+        # Each record is an artifact being (re)declared, so later records take
+        # precedence.
+        mapping = FakeArtifactMapping({})
+        for entry in entries:
+            mapping.artifacts_by_name[entry.name] = entry.artifact
+        self._num_mapping_entries = len(entries)
+        # Future records must not be appended after an incomplete one.
+        return mapping, num_bytes_used < mapping_size
+
+    def _load_json_artifact_mapping(self) -> tuple[FakeArtifactMapping, bool]:
+        """Read the artifact mapping from its older JSON format (if any)."""
+        json_path = self.mapping_path.with_suffix(".json")
+        if not json_path.exists():
+            return FakeArtifactMapping({}), False
+
+        mapping = msgspec.json.decode(json_path.read_bytes(), type=FakeArtifactMapping)
+        console.log(f"Converting artifact mapping to {str(self.mapping_path)!r}")
+        return mapping, True
+
+    @contextlib.contextmanager
+    def _mapping_locked(self) -> Iterator[None]:
+        """Keep other processes from changing the artifact mapping log."""
         self.cache_root_path.mkdir(parents=True, exist_ok=True)
-        with self.mapping_path.open("wb") as checksums:
-            checksums.write(jsonified)
+        with _file_lock(self.mapping_lock_path):
+            yield
+
+    def _write_artifact_mapping(self, mapping: FakeArtifactMapping):
+        """Replace the artifact mapping log with one record per artifact.
+
+        Must be called with the artifact mapping locked.
+        """
+        records = b"".join(
+            _encode_record(
+                _mapping_encoder,
+                FakeArtifactMappingEntry(name, artifact),
+            )
+            for name, artifact in mapping.artifacts_by_name.items()
+        )
+        new_mapping_path = self.mapping_path.with_suffix(".msgpack.tmp")
+        new_mapping_path.write_bytes(records)
+        new_mapping_path.replace(self.mapping_path)
+        self._num_mapping_entries = len(mapping.artifacts_by_name)
+
+    def _set_artifact_mapping(self, name, artifact):
+        entry = FakeArtifactMappingEntry(str(name), artifact)
+        self.artifact_mapping.artifacts_by_name[entry.name] = artifact
+
+        # Save to disk. Appending keeps this cheap no matter how many artifacts
+        # we know about.
+        with (
+            self._mapping_locked(),
+            self.mapping_path.open("ab") as mapping_file,
+        ):
+            mapping_file.write(_encode_record(_mapping_encoder, entry))
+        self._num_mapping_entries += 1
+
+    def _compact_artifact_mapping(self):
+        """Rewrite the artifact mapping log if it's mostly outdated records."""
+        num_artifacts = len(self.artifact_mapping.artifacts_by_name)
+        if self._num_mapping_entries <= MAPPING_COMPACTION_RATIO * num_artifacts:
+            return
+
+        with self._mapping_locked():
+            # Other processes may have added records since we last read it.
+            self.artifact_mapping, _ = self._load_artifact_mapping()
+            self._write_artifact_mapping(self.artifact_mapping)
 
     @override
     def __enter__(self):
-        params = dict(self.__dict__)
-        params.pop("cache")
-        params.pop("artifact_mapping")
+        # Only log small fields (the artifact mapping can get large).
+        params = {
+            "project_name": self.project_name,
+            "config": self.config,
+            "job_type": self.job_type,
+            "job_group": self.job_group,
+            "tags": self.tags,
+            "cache_root_path": self.cache_root_path,
+            "mapping_path": self.mapping_path,
+        }
         console.log("Started FakeTracker:", params)
         self._start_time = datetime.datetime.now(tz=datetime.timezone.utc)
 
@@ -135,6 +271,7 @@ class FakeTracker(Tracker):
         console.log(
             f"FakeTracker exited after {humanize.precisedelta(duration)}",
         )
+        self._compact_artifact_mapping()
 
         if exctype is not None:
             if exctype is _BailoutError:
@@ -152,6 +289,50 @@ class FakeTracker(Tracker):
 
         return False
 
+    def _store_in_cache(
+        self,
+        local_filename: Path,
+        versioned_s3_object: VersionedS3Object,
+    ) -> None:
+        """Store a file in the fake cache (if not already present)."""
+        # In this weird case, we already know the version, so there can only be
+        # an existing cache entry if its file exists.
+        cached_path = self.cache.get_path(versioned_s3_object)
+        if cached_path.exists():
+            sha1 = file_digest(local_filename)
+            existing_version_id = self.cache.get_version(
+                s3_object=versioned_s3_object,
+                sha1=sha1,
+            )
+            if existing_version_id is not None:
+                logger.info("Cache hit for {!r}", str(local_filename))
+                return
+
+            logger.info(
+                "[OFFLINE] Pretending to store {!r} to {}",
+                str(local_filename),
+                versioned_s3_object,
+            )
+            # Temporarily make it writable again since finalize_adding_file
+            # should have locked it down when it was last added.
+            cached_path.chmod(0o700)
+            fast_copy(local_filename, cached_path)
+        else:
+            logger.info(
+                "[OFFLINE] Pretending to store {!r} to {}",
+                str(local_filename),
+                versioned_s3_object,
+            )
+            # Nothing to compare against, so checksum while copying rather
+            # than reading the file twice.
+            sha1 = copy_and_digest(local_filename, cached_path)
+
+        self.cache.finalize_adding_file(
+            cached_filename=cached_path,
+            s3_object=versioned_s3_object,
+            sha1=sha1,
+        )
+
     @override
     def declare_output(
         self,
@@ -162,53 +343,34 @@ class FakeTracker(Tracker):
         strip_prefix: Path | None = None,
         metadata: dict | None = None,
     ) -> AeromancyArtifact:
-        console.log(f"FakeTracker output filenames: {local_filenames!r}")
+        console.log("FakeTracker output filenames:", local_filenames)
         if metadata:
-            console.log(f"FakeTracker output metadata: {metadata!r}")
+            console.log("FakeTracker output metadata:", metadata)
+
+        # Need a trailing slash since otherwise we end up with an absolute path.
+        prefix_to_strip = f"{strip_prefix}/" if strip_prefix else None
 
-        # Convert each file to a fake VersionedS3Object.
+        # Convert each file to a fake VersionedS3Object. Keys are joined as in
+        # `s3_destination / new_path`, but without an S3Object for each file.
+        destination_key = Path(s3_destination.key)
         s3_objects = []
         for local_filename in local_filenames:
-            new_path = local_filename
-            if strip_prefix:
-                # Need a trailing slash since otherwise we end up with an absolute path.
-                new_path = str(new_path).removeprefix(str(strip_prefix) + "/")
+            new_path = str(local_filename)
+            if prefix_to_strip:
+                new_path = new_path.removeprefix(prefix_to_strip)
             versioned_s3_object = VersionedS3Object(
                 s3_destination.bucket,
-                (s3_destination / new_path).key,
+                str(destination_key / new_path.removeprefix("/")),
                 FAKE_VERSION,  # TODO: support multiple versions
             )
             s3_objects.append(versioned_s3_object)
 
-            # Actually store the files in the fake cache (if not already
-            # present). In this weird case, we already know the version, but we
-            # can use get_version() to find out if there's an existing cache
-            # entry.
-            sha1 = file_digest(local_filename)
-            existing_version_id = self.cache.get_version(
-                s3_object=versioned_s3_object,
-                sha1=sha1,
-            )
-            if existing_version_id is None:
-                console.log(
-                    f"[OFFLINE] Pretending to store {str(local_filename)!r} to "
-                    f"{versioned_s3_object}",
-                )
-                cached_path = self.cache.get_path(versioned_s3_object)
-                if cached_path.exists():
-                    # Temporarily make it writable again since
-                    # finalize_adding_file should have locked it down when it
-                    # was last added.
-                    cached_path.chmod(0o700)
-                shutil.copy(local_filename, cached_path)
-
-                self.cache.finalize_adding_file(
-                    cached_filename=cached_path,
-                    s3_object=versioned_s3_object,
-                    sha1=sha1,
-                )
-            else:
-                console.log(f"Cache hit for {str(local_filename)!r})")
+        # Actually store the files in the fake cache. Files are independent, so
+        # this can happen in parallel.
+        _map_transfers(
+            lambda transfer: self._store_in_cache(*transfer),
+            zip(local_filenames, s3_objects, strict=True),
+        )
 
         # We now have enough to make an AeromancyArtifact.
         aero_artifact = AeromancyArtifact(
@@ -234,14 +396,19 @@ class FakeTracker(Tracker):
     ) -> Sequence[Path]:
         if isinstance(artifact, str):
             artifact_name = WandbArtifactName.parse(artifact)
-            # Basic version resolution
-            if artifact_name.version == "latest":
-                artifact_name.version = FAKE_VERSION
-            if artifact_name.project is None:
-                artifact_name.project = self.project_name
-            # We don't support sharing artifacts across entities, so we'll
-            # always mask out the entity name.
-            artifact_name.entity = FAKE_ENTITY
+            artifact_name = msgspec.structs.replace(
+                artifact_name,
+                # Basic version resolution
+                version=(
+                    FAKE_VERSION
+                    if artifact_name.version == "latest"
+                    else artifact_name.version
+                ),
+                project=artifact_name.project or self.project_name,
+                # We don't support sharing artifacts across entities, so we'll
+                # always mask out the entity name.
+                entity=FAKE_ENTITY,
+            )
             artifact = self.artifact_mapping.artifacts_by_name[str(artifact_name)]
 
         local_paths = [
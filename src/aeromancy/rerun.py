@@ -114,9 +114,6 @@ def rerun(run: str) -> None:
     console.log("Checkout directory:", checkout_dir)
     checkout_git_commit(git_remote, git_commit, checkout_dir, "rerun_branch")
 
-    console.log("Installing PDM dependencies")
-    subprocess.check_call(["pdm", "install"], cwd=checkout_dir)  # noqa: S607
-
     artifact_flags = [
         f"--artifact-override {artifact_name}"
         for artifact_name in rerun_details.artifact_names
@@ -124,10 +121,19 @@ def rerun(run: str) -> None:
     artifact_flags_str = ""
     if artifact_flags:
         artifact_flags_str = " \\\n\t".join(["", *artifact_flags])
-    console.log("Rerun with:")
-    # No console.log() here since it will include line numbers and make copy-paste
-    # messy.
-    print(f"  cd {checkout_dir} && pdm go{artifact_flags_str}")
+
+    # Installing can take a while, so show how to rerun while it happens.
+    console.log("Installing PDM dependencies")
+    pdm_install_command = ["pdm", "install"]
+    with subprocess.Popen(pdm_install_command, cwd=checkout_dir) as pdm_install:
+        console.log("Rerun with (once PDM dependencies are installed):")
+        # No console.log() here since it will include line numbers and make
+        # copy-paste messy.
+        print(f"  cd {checkout_dir} && pdm go{artifact_flags_str}")
+
+    if pdm_install.returncode:
+        raise subprocess.CalledProcessError(pdm_install.returncode, pdm_install.args)
+    console.log("PDM dependencies installed")
 
 
 if __name__ == "__main__":
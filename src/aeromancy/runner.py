@@ -7,14 +7,20 @@ You shouldn't ever need to run or call this directly -- the "pdm go" pdm script
 be setup in pyproject.toml.
 """
 
+import functools
+import hashlib
 import os
 import shlex
+import shutil
 import subprocess
 import sys
+import typing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import msgspec
 import rich_click as click
-from git.repo import Repo
 from rich.console import Console
 from rich.theme import Theme
 
@@ -23,6 +29,7 @@ from .runtime_environment import (
     AEROMANCY_ARTIFACT_OVERRIDES_ENV,
     AEROMANCY_DEBUG_MODE_ENV,
     AEROMANCY_DEV_MODE_ENV,
+    AEROMANCY_STATE_DIR,
     DOCKER_HASH_ENV,
     GIT_BRANCH_ENV,
     GIT_MESSAGE_ENV,
@@ -38,42 +45,170 @@ PASSTHROUGH_ENV_VARIABLES = (
     "AEROMANCY_AWS_SECRET_ACCESS_KEY",
     "AEROMANCY_AWS_S3_ENDPOINT_URL",
     "AEROMANCY_AWS_REGION",
+    "AEROMANCY_CACHE_MAX_BYTES",
     "WANDB_API_KEY",
 )
 
-repo = Repo(".")
+# If set, a BuildKit cache (e.g., "type=registry,ref=<image>:buildcache") to
+# import Docker layers from and export them to, which lets builds on other
+# machines reuse them. Exporting caches isn't supported by the default "docker"
+# buildx driver, so this also needs a different builder (see BUILDX_BUILDER).
+DOCKER_BUILD_CACHE_ENV = "AEROMANCY_DOCKER_BUILD_CACHE"
+
+# Where our Dockerfile lives. The version tag should be updated whenever
+# ../../docker/Dockerfile changes.
+DOCKERFILE_CONTEXT = "https://github.com/quant-aq/aeromancy.git#v0.2.2:docker"
+
+# Records which Docker images were built from which inputs, so we can skip
+# rebuilding them.
+DOCKER_IMAGE_CACHE_PATH = AEROMANCY_STATE_DIR / "docker_images.json"
+
+# Snapshots of project files (named by Git tree hash) to use as Docker build
+# contexts. Only the most recently used ones are kept.
+BUILD_CONTEXT_CACHE_DIR = AEROMANCY_STATE_DIR / "build_contexts"
+MAX_CACHED_BUILD_CONTEXTS = 8
+
+# Lines of `docker build` output to show if it fails.
+DOCKER_OUTPUT_REPLAY_LINES = 2048
+
 custom_theme = Theme({"info": "dim cyan", "warning": "magenta", "error": "bold red"})
 console = Console(theme=custom_theme)
 
 
-def interactive(command_pieces: list[str]) -> None:
-    """Run interactive shell commands."""
-    formatted_pieces = shlex.join(command_pieces)
-    console.log(f"[bold]Running:[/bold] {formatted_pieces}", style="info")
-    exit_code = subprocess.call(
-        command_pieces,
-        stdout=sys.stdout,
-        stderr=subprocess.STDOUT,
+class _GitMetadata(msgspec.Struct, frozen=True):
+    """Information about the commit we're running from.
+
+    Attributes
+    ----------
+    commit
+        Full hash of the current commit.
+    tree
+        Hash of the current commit's tree (i.e., its contents).
+    branch
+        Name of the current branch ("HEAD" if detached).
+    message
+        Full commit message.
+    """
+
+    commit: str
+    tree: str
+    branch: str
+    message: str
+
+
+def _git(*args: str) -> str:
+    """Run a git command and return its output."""
+    return subprocess.run(
+        ["git", *args],  # noqa: S607
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+
+@functools.cache
+def _git_metadata() -> _GitMetadata:
+    """Look up commit information with a single git call (rather than GitPython)."""
+    commit, tree, ref_names, message = _git(
+        "show",
+        "--no-patch",
+        "--format=%H%x00%T%x00%D%x00%B",
+        "HEAD",
+    ).split("\0", 3)
+    # When on a branch, `ref_names` includes "HEAD -> <branch>".
+    branch = "HEAD"
+    for ref_name in ref_names.split(", "):
+        if ref_name.startswith("HEAD -> "):
+            branch = ref_name.removeprefix("HEAD -> ").removeprefix("refs/heads/")
+    return _GitMetadata(commit=commit, tree=tree, branch=branch, message=message)
+
+
+class _GitStatus(msgspec.Struct, frozen=True):
+    """State of the working tree, from `git status`.
+
+    Attributes
+    ----------
+    branch
+        Name of the current branch ("(detached)" if detached).
+    changed_files
+        Tracked files with uncommitted changes (staged or not).
+    untracked_files
+        Files which aren't tracked (and aren't ignored).
+    """
+
+    branch: str
+    changed_files: list[str]
+    untracked_files: list[str]
+
+
+def _git_status() -> _GitStatus:
+    """Check the working tree with a single `git status` call.
+
+    See https://git-scm.com/docs/git-status#_porcelain_format_version_2 for
+    the format.
+    """
+    status = _git(
+        "status",
+        "--porcelain=v2",
+        "--branch",
+        "--untracked-files=all",
+        "-z",
     )
-    if exit_code:
-        console.log(f"Exit code {exit_code} for {formatted_pieces}", style="warning")
+    branch = ""
+    changed_files = []
+    untracked_files = []
+    records = iter(status.split("\0"))
+    for record in records:
+        match record[:1]:
+            case "#":
+                if record.startswith("# branch.head "):
+                    branch = record.removeprefix("# branch.head ")
+            case "1":
+                changed_files.append(record.split(" ", 8)[8])
+            case "2":
+                changed_files.append(record.split(" ", 9)[9])
+                # Renames and copies are followed by the original path.
+                next(records, None)
+            case "u":
+                changed_files.append(record.split(" ", 10)[10])
+            case "?":
+                untracked_files.append(record.removeprefix("? "))
+    return _GitStatus(
+        branch=branch,
+        changed_files=changed_files,
+        untracked_files=untracked_files,
+    )
+
+
+def replace_process(command_pieces: list[str]) -> typing.NoReturn:
+    """Replace this process with a shell command (which takes over the terminal).
+
+    This is for the final command we run, since there's nothing left to do
+    after it finishes. Exiting early means we don't hold onto resources while it
+    runs and it gets signals (e.g., Ctrl-C) directly.
+    """
+    console.log(f"[bold]Running:[/bold] {shlex.join(command_pieces)}", style="info")
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.execvp(command_pieces[0], command_pieces)  # noqa: S606
 
 
 def check_git_state() -> None:
     """Ensure our git repo is set up properly for tracking."""
-    if str(repo.active_branch) in ("main", "master"):
+    git_status = _git_status()
+    if git_status.branch in ("main", "master"):
         raise SystemExit(
             "Error: Switch to a non-main branch before running experiments.",
         )
 
-    # First, call `git diff` since it's well formatted.
-    if subprocess.call("/usr/bin/git diff --exit-code", shell=True):  # noqa: S602
-        print()
-
-    if repo.is_dirty() or repo.untracked_files:
-        if repo.untracked_files:
+    if git_status.changed_files or git_status.untracked_files:
+        if git_status.changed_files:
+            console.log("Uncommitted changes:", style="warning")
+            for filename in git_status.changed_files:
+                console.log(f"  {filename}", style="warning")
+        if git_status.untracked_files:
             console.log("Untracked files:", style="warning")
-            for filename in repo.untracked_files:
+            for filename in git_status.untracked_files:
                 console.log(f"  {filename}", style="warning")
         console.log(
             "Error: You must checkin your code before starting a run.",
@@ -82,15 +217,158 @@ def check_git_state() -> None:
         raise SystemExit
 
 
+def _docker_image_cache_key(extra_debian_packages: list[str], source_tree: str) -> str:
+    """Identify everything that goes into building a Docker image."""
+    build_inputs = msgspec.json.encode(
+        [DOCKERFILE_CONTEXT, extra_debian_packages, source_tree],
+    )
+    return hashlib.sha256(build_inputs).hexdigest()
+
+
+def _load_docker_image_cache() -> dict[str, str]:
+    cache_path = DOCKER_IMAGE_CACHE_PATH.expanduser()
+    if not cache_path.exists():
+        return {}
+    try:
+        return msgspec.json.decode(cache_path.read_bytes(), type=dict[str, str])
+    except msgspec.DecodeError:
+        # Not worth failing over (it'll be rewritten after the next build).
+        return {}
+
+
+def _tag_cached_docker_image(
+    docker_tag: str,
+    extra_debian_packages: list[str],
+    source_tree: str,
+) -> str | None:
+    """Tag a previously built Docker image for these inputs (if there is one).
+
+    Returns the hash of the Docker image or None if there isn't one.
+    """
+    cache_key = _docker_image_cache_key(extra_debian_packages, source_tree)
+    docker_hash = _load_docker_image_cache().get(cache_key)
+    if docker_hash is None:
+        return None
+
+    # This also checks that the image still exists.
+    docker_tag_command = ["docker", "tag", docker_hash, docker_tag]
+    if subprocess.run(docker_tag_command, capture_output=True, check=False).returncode:
+        return None
+    console.log(f"[bold]Reusing Docker image:[/bold] {docker_hash}", style="info")
+    return docker_hash
+
+
+def _record_docker_image(
+    docker_hash: str,
+    extra_debian_packages: list[str],
+    source_tree: str,
+) -> None:
+    cache = _load_docker_image_cache()
+    cache[_docker_image_cache_key(extra_debian_packages, source_tree)] = docker_hash
+    cache_path = DOCKER_IMAGE_CACHE_PATH.expanduser()
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    cache_path.write_bytes(msgspec.json.encode(cache))
+
+
+def _export_build_context(source_tree: str) -> Path:
+    """Export the project's files at a Git tree to a directory.
+
+    Unlike the working tree, this only contains tracked files. Exports are
+    reused for the same tree, so Docker sees exactly the same input (down to
+    modification times) each time and can reuse cached layers more often.
+
+    Returns
+    -------
+        Path to the exported files.
+    """
+    cache_dir = BUILD_CONTEXT_CACHE_DIR.expanduser()
+    context_dir = cache_dir / source_tree
+    # Written once an export has finished. It lives next to the export (rather
+    # than in it) so it doesn't end up in the Docker image.
+    complete_marker = cache_dir / f"{source_tree}.complete"
+    if complete_marker.exists() and context_dir.is_dir():
+        # Mark as recently used.
+        complete_marker.touch()
+        return context_dir
+
+    # Anything left over from an earlier (interrupted) export is incomplete.
+    shutil.rmtree(context_dir, ignore_errors=True)
+    partial_dir = cache_dir / f"{source_tree}.partial"
+    shutil.rmtree(partial_dir, ignore_errors=True)
+    partial_dir.mkdir(parents=True)
+    git_archive = subprocess.Popen(
+        ["git", "archive", "--format=tar", source_tree],  # noqa: S607
+        stdout=subprocess.PIPE,
+    )
+    try:
+        subprocess.run(
+            ["tar", "--extract", "--directory", str(partial_dir)],  # noqa: S607
+            stdin=git_archive.stdout,
+            check=True,
+        )
+    finally:
+        if git_archive.stdout:
+            git_archive.stdout.close()
+        git_archive_status = git_archive.wait()
+    if git_archive_status:
+        raise subprocess.CalledProcessError(git_archive_status, git_archive.args)
+    partial_dir.rename(context_dir)
+    complete_marker.touch()
+
+    stale_markers = sorted(
+        cache_dir.glob("*.complete"),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )[MAX_CACHED_BUILD_CONTEXTS:]
+    for stale_marker in stale_markers:
+        # Remove the marker first so a partially removed export isn't reused.
+        stale_marker.unlink(missing_ok=True)
+        shutil.rmtree(stale_marker.with_suffix(""), ignore_errors=True)
+    return context_dir
+
+
 def build_docker(
     docker_tag: str,
     extra_debian_packages: list[str],
     quiet: bool = True,
+    source_tree: str | None = None,
+    before_build: typing.Callable[[], object] | None = None,
 ) -> str:
     """Build our Docker image for running experiments.
 
-    Returns the hash of the Docker image.
+    Parameters
+    ----------
+    docker_tag
+        Tag to apply to the image.
+    extra_debian_packages
+        Additional Debian packages to install in the image.
+    quiet, optional
+        If False, show Docker's output as it builds.
+    source_tree, optional
+        Git tree hash for the project's files. If set (and `quiet`), these
+        must match the project's working tree. This lets us reuse images
+        built from the same inputs instead of running `docker build` again,
+        and to build from an exported copy of the tree rather than the
+        working tree itself.
+    before_build, optional
+        Called just before running `docker build` (if we need to). This can
+        wait on (or raise errors from) checks that must pass before building.
+
+    Returns
+    -------
+        The hash of the Docker image.
     """
+    use_image_cache = quiet and source_tree is not None
+    if use_image_cache:
+        docker_hash = _tag_cached_docker_image(
+            docker_tag,
+            extra_debian_packages,
+            source_tree,
+        )
+        if docker_hash is not None:
+            return docker_hash
+
+    project_context = "." if source_tree is None else _export_build_context(source_tree)
     ssh_auth_sock = os.environ.get("SSH_AUTH_SOCK", "")
     docker_commmand_pieces = [
         "docker",
@@ -101,20 +379,32 @@ def build_docker(
         # Add local project (i.e., not Aeromancy's repo) as a build context so
         # we can copy project-specific files to the image.
         "--build-context",
-        "project=.",
+        f"project={project_context}",
     ]
     if extra_debian_packages:
         build_arg = f"EXTRA_DEBIAN_PACKAGES={' '.join(extra_debian_packages)}"
         docker_commmand_pieces.extend(("--build-arg", build_arg))
+    if build_cache := os.environ.get(DOCKER_BUILD_CACHE_ENV):
+        docker_commmand_pieces.extend(
+            (
+                "--cache-from",
+                build_cache,
+                "--cache-to",
+                f"{build_cache},mode=max",
+                # Non-default builders don't make images available to `docker
+                # run` unless asked to.
+                "--load",
+            ),
+        )
     if quiet:
         docker_commmand_pieces.append("--quiet")
+    if before_build is not None:
+        before_build()
     docker_commmand_pieces.extend(
         (
             "--tag",
             docker_tag,
-            # The version tag should be updated whenever ../../docker/Dockerfile
-            # changes.
-            "https://github.com/quant-aq/aeromancy.git#v0.2.2:docker",
+            DOCKERFILE_CONTEXT,
         ),
     )
 
@@ -122,25 +412,35 @@ def build_docker(
         f"[bold]Building Docker image:[/bold] {shlex.join(docker_commmand_pieces)}",
         style="info",
     )
-    try:
-        docker_output = subprocess.check_output(
-            docker_commmand_pieces,
-            text=True,
-            stderr=subprocess.STDOUT,
-        )
-        docker_status = 0
-    except subprocess.CalledProcessError as cpe:
-        docker_output = cpe.output
-        docker_status = cpe.returncode
+    # Stream the output rather than holding onto all of it. In quiet mode,
+    # Docker only prints the image hash, so we just need the last line (plus
+    # some recent history in case the build fails).
+    recent_lines: deque[str] = deque(maxlen=DOCKER_OUTPUT_REPLAY_LINES)
+    last_line = ""
+    with subprocess.Popen(
+        docker_commmand_pieces,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+    ) as docker_process:
+        # stdout is always set since we asked for a pipe.
+        for line in docker_process.stdout or ():
+            if not quiet:
+                console.out(line, style="info", highlight=False, end="")
+            recent_lines.append(line)
+            if line.strip():
+                last_line = line
+    docker_status = docker_process.returncode
 
-    if docker_status or not quiet:
-        console.log(
-            f"Docker output:\n{docker_output}",
-            style="error" if docker_status else "info",
-        )
     if docker_status:
+        if quiet:
+            console.log(f"Docker output:\n{''.join(recent_lines)}", style="error")
         raise SystemExit(f"Docker image building failed with exit code {docker_status}")
-    return docker_output.strip()
+    docker_hash = last_line.strip()
+    if use_image_cache:
+        _record_docker_image(docker_hash, extra_debian_packages, source_tree)
+    return docker_hash
 
 
 def store_environment_variables(
@@ -157,12 +457,15 @@ def store_environment_variables(
     """
     if dev_mode:
         # Set some bogus values so we can operate in development mode with an
-        # incomplete Git repo setup.
+        # incomplete Git repo setup (this also avoids calling git at all).
         message_lines = ["development"]
         git_remote = "https://github.com/some-valid-looking/git-repo-url.git"
+        git_branch = "development"
     else:
-        message_lines = str(repo.commit().message).splitlines()
-        git_remote = next(repo.remote().urls)
+        git_metadata = _git_metadata()
+        message_lines = git_metadata.message.splitlines()
+        git_remote = _git("remote", "get-url", "origin").strip()
+        git_branch = git_metadata.branch
 
     # Show a truncated version of the first line.
     message = message_lines[0]
@@ -173,7 +476,7 @@ def store_environment_variables(
         GIT_REF_ENV: git_ref,
         GIT_MESSAGE_ENV: message,
         GIT_REMOTE_ENV: git_remote,
-        GIT_BRANCH_ENV: str(repo.active_branch),
+        GIT_BRANCH_ENV: git_branch,
         DOCKER_HASH_ENV: docker_hash,
         AEROMANCY_ARTIFACT_OVERRIDES_ENV: ",".join(aeromancy_artifact_overrides),
         AEROMANCY_DEV_MODE_ENV: str(dev_mode),
@@ -187,9 +490,28 @@ def store_environment_variables(
     # so we store them in an --env-file.
     all_passthrough_variables = PASSTHROUGH_ENV_VARIABLES + tuple(extra_env_vars)
     env_file_path = Path(".env_file")
-    with env_file_path.open("w") as env_file:
-        for key in tuple(updates.keys()) + all_passthrough_variables:
-            env_file.write(f"{key}\n")
+    env_file_keys = (*updates.keys(), *all_passthrough_variables)
+    env_file_contents = "".join(f"{key}\n" for key in env_file_keys).encode()
+    # It's usually the same as last time, in which case we leave it alone (unless
+    # it was created by an older version which didn't keep it private).
+    if not (
+        env_file_path.exists()
+        and env_file_path.stat().st_mode & 0o077 == 0
+        and env_file_path.read_bytes() == env_file_contents
+    ):
+        # Only variable names are stored here, but their values are often
+        # secrets, so keep it private anyway.
+        env_file_fd = os.open(
+            env_file_path,
+            os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+            0o600,
+        )
+        try:
+            # The mode above only applies if the file is created.
+            os.fchmod(env_file_fd, 0o600)
+            os.write(env_file_fd, env_file_contents)
+        finally:
+            os.close(env_file_fd)
     return str(env_file_path)
 
 
@@ -198,10 +520,10 @@ def run_docker(
     docker_tag: str,
     docker_subcommand_pieces: list[str],
     extra_docker_run_args: list[str],
-) -> None:
-    """Run `docker run` with specified arguments."""
+) -> typing.NoReturn:
+    """Run `docker run` with specified arguments (in place of this process)."""
     local_cache_path = Path("~/Cache").expanduser()
-    interactive(
+    replace_process(
         [
             "docker",
             "run",
@@ -242,10 +564,15 @@ def main(
         # since an early Aeromancy project might not be completely set up with
         # Git.
         git_ref = docker_tag = "development"
+        # The working tree may have changes, so we can't identify its contents.
+        source_tree = None
     else:
-        git_ref = str(repo.commit())
+        git_ref = _git_metadata().commit
         docker_tag = git_ref[:7]  # Keep it short for cleaner command lines.
-        check_git_state()
+        # Docker images are built from the commit's tree rather than the working
+        # tree itself, so we can start preparing to build while checking that
+        # the working tree is clean.
+        source_tree = _git_metadata().tree
 
     # Autoset debug mode when we're doing a debug_shell (these are separate
     # options since we might want debug mode outside of a debug shell).
@@ -254,11 +581,20 @@ def main(
     if dev:
         docker_hash = NOT_IN_DOCKER
     else:
-        docker_hash = build_docker(
-            docker_tag=docker_tag,
-            extra_debian_packages=extra_debian_packages,
-            quiet=not debug,
-        )
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            wait_for_git_state_check = None
+            if not debug_shell:
+                wait_for_git_state_check = executor.submit(check_git_state).result
+            docker_hash = build_docker(
+                docker_tag=docker_tag,
+                extra_debian_packages=extra_debian_packages,
+                quiet=not debug,
+                source_tree=source_tree,
+                before_build=wait_for_git_state_check,
+            )
+            # The build may have been skipped, so we still need to check.
+            if wait_for_git_state_check is not None:
+                wait_for_git_state_check()
         if debug:
             # Building Docker images in debug mode makes it tough to determine
             # the image hash, so we'll set it to a special value.
@@ -288,7 +624,7 @@ def main(
         ]
 
     if dev:
-        interactive(docker_subcommand_pieces)
+        replace_process(docker_subcommand_pieces)
     else:
         run_docker(
             env_filename,
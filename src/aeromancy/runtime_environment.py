@@ -1,11 +1,17 @@
 """Captures information about the runtime environment for Aeromancy."""
 
+import functools
+import typing
 from contextlib import suppress
 from os import environ as env
+from pathlib import Path
 
 import giturlparse
 from loguru import logger
 
+if typing.TYPE_CHECKING:
+    from .artifacts import WandbArtifactName
+
 # Constants for environment variables which configure runtime state.
 AEROMANCY_DEV_MODE_ENV = "AEROMANCY_DEV_MODE"
 AEROMANCY_DEBUG_MODE_ENV = "AEROMANCY_DEBUG_MODE"
@@ -19,8 +25,30 @@ GIT_REMOTE_ENV = "GIT_REMOTE"
 # Used to explicitly mark that we're not running in Docker.
 NOT_IN_DOCKER = "NOT_IN_DOCKER"
 
-# Singleton to store our RuntimeEnvironment instance. See get_runtime_environment().
-_runtime_environment = None
+# Where Aeromancy keeps its own state (e.g., records of which Actions have run).
+# This lives in the cache directory since that persists between Docker
+# containers. S3 bucket names can't start with a dot, so the S3 cache (which
+# shares this directory) knows to leave it alone.
+AEROMANCY_STATE_DIR = Path("~/Cache/.aeromancy")
+
+
+# Values (after lowercasing) which turn on boolean environment variables.
+TRUE_ENV_VALUES = frozenset({"true", "1", "yes"})
+
+
+def _env_flag(name: str) -> bool:
+    """Whether a boolean environment variable is turned on."""
+    return env.get(name, "").lower() in TRUE_ENV_VALUES
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_git_repo_name(git_remote_url: str | None) -> str | None:
+    """Extract the repo name from a Git remote URL (if it's valid)."""
+    with suppress(ValueError, TypeError):
+        parsed = giturlparse.parse(git_remote_url)
+        if parsed.valid:
+            return parsed.data.get("repo")
+    return None
 
 
 class RuntimeEnvironment:
@@ -38,12 +66,12 @@ class RuntimeEnvironment:
 
         # When running in dev mode, we use FakeTracker and avoid any calls
         # to W&B or S3.
-        self.dev_mode = env.get(AEROMANCY_DEV_MODE_ENV, "").lower() == "true"
+        self.dev_mode = _env_flag(AEROMANCY_DEV_MODE_ENV)
 
         # Debug mode makes us more verbose about Aeromancy internals. It's
         # primarily used for debugging Aeromancy itself or in conjunction with
         # dev mode while performing development in an Aeromancy project.
-        self.debug_mode = env.get(AEROMANCY_DEBUG_MODE_ENV, "").lower() == "true"
+        self.debug_mode = _env_flag(AEROMANCY_DEBUG_MODE_ENV)
 
         # Offline mode means we should avoid any sort of network access. It's currently
         # only triggered by dev mode.
@@ -56,19 +84,50 @@ class RuntimeEnvironment:
 
         # Parse artifact overrides (comma-separated list)
         artifact_overrides_env = env.get(AEROMANCY_ARTIFACT_OVERRIDES_ENV, "")
-        self.artifact_overrides: list[str] = (
+        self.artifact_overrides = (
             artifact_overrides_env.split(",") if artifact_overrides_env else []
         )
 
+    @property
+    def artifact_overrides(self) -> list[str]:
+        """Artifact names (with versions) to use instead of the latest versions.
+
+        Assign a new list to change these (modifying the list in place won't
+        update `parsed_artifact_overrides`).
+        """
+        return self._artifact_overrides
+
+    @artifact_overrides.setter
+    def artifact_overrides(self, artifact_overrides: list[str]):
+        self._artifact_overrides = artifact_overrides
+        self._artifact_overrides_key = tuple(artifact_overrides)
+        self._parsed_artifact_overrides = None
+
+    @property
+    def artifact_overrides_key(self) -> tuple[str, ...]:
+        """`artifact_overrides` as a tuple, e.g., for use in cache keys."""
+        return self._artifact_overrides_key
+
+    @property
+    def parsed_artifact_overrides(self) -> list["WandbArtifactName"]:
+        """`artifact_overrides`, parsed into `WandbArtifactName`s.
+
+        These are parsed on first use. Callers should not modify them.
+        """
+        if self._parsed_artifact_overrides is None:
+            # Imported here since artifacts depends on this module.
+            from .artifacts import WandbArtifactName
+
+            self._parsed_artifact_overrides = [
+                WandbArtifactName.parse(artifact_name)
+                for artifact_name in self._artifact_overrides
+            ]
+        return self._parsed_artifact_overrides
+
     def _parse_git_remote(self):
         """Parse Git remote URL (if available)."""
         self.git_remote_url = env.get(GIT_REMOTE_ENV)
-        self.git_repo_name = None
-
-        with suppress(ValueError, TypeError):
-            parsed = giturlparse.parse(self.git_remote_url)
-            if parsed.valid:
-                self.git_repo_name = parsed.data.get("repo")
+        self.git_repo_name = _parse_git_repo_name(self.git_remote_url)
 
         if not self.git_repo_name:
             message = f"Couldn't parse Git remote URL: {self.git_remote_url!r}"
@@ -92,15 +151,14 @@ class RuntimeEnvironment:
             )
 
 
+@functools.cache
 def get_runtime_environment() -> RuntimeEnvironment:
     """Fetch the `RuntimeEnvironment` global.
 
-    This is created on demand and reuses existing instances.
+    This is created on demand and reuses existing instances. Use
+    `get_runtime_environment.cache_clear()` to force it to be recreated.
     """
-    global _runtime_environment
-    if not _runtime_environment:
-        _runtime_environment = RuntimeEnvironment()
-    return _runtime_environment
+    return RuntimeEnvironment()
 
 
 def _ensure_valid_environment():
@@ -6,33 +6,187 @@ filesystem. For example, in the key "a/b/c", we would say that "c" is the in
 pseudodirectory "a/b".
 """
 
+import contextlib
+import fcntl
+import functools
 import hashlib
+import mmap
+import operator
 import os
+import re
 import shutil
+import sys
+import tempfile
+import threading
 import time
 from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from typing import BinaryIO, TypeVar, cast
 
 import boto3
+import botocore.config
 import humanize
 import hyperlink
 import msgspec
+from boto3.s3.transfer import TransferConfig
 from loguru import logger
 
 # Global S3 Client (used as default instance in from_env_variables())
 _S3_CLIENT = None
 
 
+# ioctl request which asks the filesystem to share the source file's blocks with
+# the destination (a "reflink"), from linux/fs.h. Request numbers are
+# platform-specific, so this is only used on Linux.
+_FICLONE = 0x40049409
+
+# Chunk size for reads (copying and hashing) which go through userspace.
+_COPY_BUFFER_SIZE = 1024 * 1024
+
+# Shared chunk buffer, so reads don't need to allocate a new one each time.
+_copy_buffer = memoryview(bytearray(_COPY_BUFFER_SIZE))
+_copy_buffer_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _borrow_copy_buffer() -> Iterator[memoryview]:
+    """Borrow the shared chunk buffer (or a new one if it's already in use)."""
+    if not _copy_buffer_lock.acquire(blocking=False):
+        yield memoryview(bytearray(_COPY_BUFFER_SIZE))
+        return
+    try:
+        yield _copy_buffer
+    finally:
+        _copy_buffer_lock.release()
+
+
+# Files at least this large are memory mapped to compute their digests.
+_MMAP_DIGEST_MIN_SIZE = 64 * 1024 * 1024
+
+
 def file_digest(filename: Path) -> str:
-    """Compute the SHA1 hash of a file."""
+    """Compute the SHA1 hash of a file.
+
+    Results are reused while the file's modification time and size stay the
+    same.
+    """
+    stat = filename.stat()
+    return _file_digest(str(filename.absolute()), stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=4096)
+def _file_digest(filename: str, mtime_ns: int, size: int) -> str:
+    """Compute the SHA1 hash of a file (`mtime_ns` and `size` are cache keys)."""
     # TODO: replace with hashlib.file_digest in Python 3.11
     sha1 = hashlib.sha1(usedforsecurity=False)
-    sha1.update(filename.open(mode="rb").read())
+    if size <= _COPY_BUFFER_SIZE:
+        # Small files are read in one go, which has less overhead than
+        # borrowing a buffer and reading into it.
+        with Path(filename).open(mode="rb", buffering=0) as file:
+            sha1.update(file.read())
+        return sha1.hexdigest()
+
+    if size >= _MMAP_DIGEST_MIN_SIZE:
+        # Hashing a mapping of large files saves copying their contents.
+        with (
+            Path(filename).open(mode="rb") as file,
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped,
+        ):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+            sha1.update(mapped)
+        return sha1.hexdigest()
+
+    with (
+        Path(filename).open(mode="rb", buffering=0) as file,
+        _borrow_copy_buffer() as buffer,
+    ):
+        while num_bytes := file.readinto(buffer):
+            sha1.update(buffer[:num_bytes])
+    return sha1.hexdigest()
+
+
+def _copy_contents(source_file: BinaryIO, dest_file: BinaryIO) -> None:
+    """Copy all data from `source_file` to `dest_file`, fastest method first."""
+    source_fd = source_file.fileno()
+    dest_fd = dest_file.fileno()
+
+    if sys.platform == "linux":
+        with contextlib.suppress(OSError):
+            fcntl.ioctl(dest_fd, _FICLONE, source_fd)
+            return
+
+    if hasattr(os, "copy_file_range"):
+        try:
+            while os.copy_file_range(source_fd, dest_fd, _COPY_BUFFER_SIZE):
+                pass
+        except OSError:
+            # Unsupported for this pair of files, so start over below.
+            source_file.seek(0)
+            dest_file.seek(0)
+            dest_file.truncate()
+        else:
+            return
+
+    with _borrow_copy_buffer() as buffer:
+        while num_bytes := source_file.readinto(buffer):
+            dest_file.write(buffer[:num_bytes])
+
+
+def fast_copy(source: Path, destination: Path) -> None:
+    """Copy a file's contents and permission bits, like `shutil.copy`.
+
+    Where possible, the copy happens without moving any data through userspace:
+    first by cloning the file (on copy-on-write filesystems like Btrfs and XFS),
+    then via `os.copy_file_range`. If neither is supported, we fall back to a
+    buffered copy.
+
+    Parameters
+    ----------
+    source
+        File to copy.
+    destination
+        Where to copy `source` to. This is overwritten if it exists.
+    """
+    with source.open("rb") as source_file, destination.open("wb") as dest_file:
+        _copy_contents(source_file, dest_file)
+    shutil.copymode(source, destination)
+
+
+def copy_and_digest(source: Path, destination: Path) -> str:
+    """Copy a file like `fast_copy`, computing its SHA1 hash along the way.
+
+    This reads `source` once, so it's cheaper than calling `file_digest` and
+    then copying when both are needed.
+
+    Parameters
+    ----------
+    source
+        File to copy.
+    destination
+        Where to copy `source` to. This is overwritten if it exists.
+
+    Returns
+    -------
+        The SHA1 hash of `source`, as from `file_digest`.
+    """
+    sha1 = hashlib.sha1(usedforsecurity=False)
+    with (
+        source.open("rb", buffering=0) as source_file,
+        destination.open("wb") as dest_file,
+        _borrow_copy_buffer() as buffer,
+    ):
+        while num_bytes := source_file.readinto(buffer):
+            chunk = buffer[:num_bytes]
+            sha1.update(chunk)
+            dest_file.write(chunk)
+    shutil.copymode(source, destination)
     return sha1.hexdigest()
 
 
-class S3Bucket(msgspec.Struct, frozen=True):
+class S3Bucket(msgspec.Struct, frozen=True, gc=False):
     """Represents an S3 bucket.
 
     Attributes
@@ -52,7 +206,14 @@ class S3Bucket(msgspec.Struct, frozen=True):
         return S3Object(self.bucket, key)
 
 
-class S3Object(msgspec.Struct, frozen=True, order=True):
+def _is_normalized_key(key: str) -> bool:
+    """Whether `pathlib` would leave an S3 key as is."""
+    return bool(key) and not (
+        key.startswith("/") or key.endswith("/") or "//" in key or "/./" in f"/{key}/"
+    )
+
+
+class S3Object(msgspec.Struct, frozen=True, order=True, gc=False):
     """Represents the path to an S3 object.
 
     Attributes
@@ -100,16 +261,18 @@ class S3Object(msgspec.Struct, frozen=True, order=True):
         # "/b" -> "/b" instead of "/a/b".
         sanitized_piece0 = pieces[0].removeprefix("/")
         pieces = (sanitized_piece0,) + pieces[1:]
-        path = Path(self.key)
-        new_key = path.joinpath(*pieces)
-        return S3Object(self.bucket, str(new_key))
+        new_key = "/".join((self.key, *pieces)).removesuffix("/")
+        if not _is_normalized_key(new_key):
+            # Let pathlib deal with any empty pieces, "." components, etc.
+            new_key = str(Path(self.key).joinpath(*pieces))
+        return S3Object(self.bucket, new_key)
 
     def to_dict(self):
         """Convert to a dictionary of field names to field values."""
         return {f: getattr(self, f) for f in self.__struct_fields__}
 
 
-class VersionedS3Object(S3Object, frozen=True):
+class VersionedS3Object(S3Object, frozen=True, gc=False):
     """Represents the path to an versioned S3 object."""
 
     version_id: str
@@ -132,13 +295,51 @@ class VersionedS3Object(S3Object, frozen=True):
             version_id=aeromancy_uri.fragment,
         )
 
+    @classmethod
+    def from_aeromancy_uri_str(cls, aeromancy_uri: str):
+        """Create a corresponding `VersionedS3Object` from a URL string.
+
+        This is equivalent to parsing `aeromancy_uri` with `hyperlink` and
+        calling `from_aeromancy_uri`, but much faster for typical URLs (i.e.,
+        those without any escaped characters).
+        """
+        scheme, _, rest = aeromancy_uri.partition("://")
+        if scheme == "aeromancy" and "%" not in rest and "?" not in rest:
+            location, _, version_id = rest.partition("#")
+            bucket, _, key = location.partition("/")
+            if bucket and key and version_id:
+                return cls(bucket=bucket, key=key, version_id=version_id)
+
+        return cls.from_aeromancy_uri(hyperlink.parse(aeromancy_uri))
+
+
+_T = TypeVar("_T")
+
+# Marks the end of an iterator in `_prefetch`.
+_EXHAUSTED = object()
+
+
+def _prefetch(iterable: Iterable[_T]) -> Iterator[_T]:
+    """Iterate over `iterable`, fetching each item while the previous is in use.
+
+    This is useful for paginated S3 responses, where each page is a separate
+    request (and each request depends on the previous page, so they can't be
+    made in parallel).
+    """
+    iterator = iter(iterable)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        next_item = executor.submit(next, iterator, _EXHAUSTED)
+        while (item := next_item.result()) is not _EXHAUSTED:
+            next_item = executor.submit(next, iterator, _EXHAUSTED)
+            yield cast(_T, item)
+
 
 def version_iterator(s3_client, bucket, key):
     """Retrieve all versions of an object."""
     # Apparently the S3 paginator still requires a bit of work to decode.
     paginator = s3_client.get_paginator("list_object_versions")
     response_iterator = paginator.paginate(Bucket=bucket, Prefix=key)
-    for response in response_iterator:
+    for response in _prefetch(response_iterator):
         for version in response["Versions"]:
             # Since we provided a prefix, we may get expansions of that prefix too.
             if version["Key"] != key:
@@ -150,13 +351,15 @@ def list_objects_iterator(s3_client, bucket, prefix):
     """Retrieve all objects that match a prefix in a bucket."""
     paginator = s3_client.get_paginator("list_objects_v2")
     response_iterator = paginator.paginate(Bucket=bucket, Prefix=prefix)
-    for response in response_iterator:
-        contents = response.get("Contents")
-        if not contents:
-            raise FileNotFoundError(f"No files matched for {bucket!r} and {prefix!r}")
-        for entry in contents:
+    found_any = False
+    for response in _prefetch(response_iterator):
+        # Pages may be empty (even ones other than the first).
+        for entry in response.get("Contents", ()):
+            found_any = True
             key: str = entry["Key"]
             yield key
+    if not found_any:
+        raise FileNotFoundError(f"No files matched for {bucket!r} and {prefix!r}")
 
 
 class CacheEntry(msgspec.Struct, order=True):
@@ -170,50 +373,203 @@ class CacheEntry(msgspec.Struct, order=True):
     checksum_sha1: str
 
 
+# Logs (e.g., the cache's checksum index) are sequences of records, each a
+# msgpack payload preceded by its length since msgpack has no delimiters. Adding
+# a record only needs to append it rather than rewriting the whole log.
+_RECORD_LENGTH_BYTES = 4
+
+
+def _encode_record(encoder: msgspec.msgpack.Encoder, record: object) -> bytes:
+    """Encode `record` for appending to a log."""
+    payload = encoder.encode(record)
+    return len(payload).to_bytes(_RECORD_LENGTH_BYTES, "little") + payload
+
+
+def _decode_records(
+    decoder: msgspec.msgpack.Decoder[_T],
+    data: bytes | mmap.mmap,
+) -> tuple[list[_T], int]:
+    """Decode the records in a log, returning them and the number of bytes used.
+
+    If fewer bytes were used than are in `data`, the log ends with an incomplete
+    record (e.g., we were interrupted while writing it). The log should be
+    rewritten before appending to it again, or the new records would be lost.
+    """
+    records = []
+    # Released explicitly so that `data` can be closed if it's an mmap.
+    with memoryview(data) as view:
+        offset = 0
+        while offset + _RECORD_LENGTH_BYTES <= len(view):
+            start = offset + _RECORD_LENGTH_BYTES
+            end = start + int.from_bytes(view[offset:start], "little")
+            if end > len(view):
+                break
+            records.append(decoder.decode(view[start:end]))
+            offset = end
+    return records, offset
+
+
+# The cache's checksum index is a log of `CacheEntry` records.
+_checksums_encoder = msgspec.msgpack.Encoder()
+_checksums_decoder = msgspec.msgpack.Decoder(CacheEntry)
+
+
+@contextlib.contextmanager
+def _file_lock(lock_path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on `lock_path`, which other processes respect.
+
+    Processes sharing a log take this lock while appending to it or rewriting it,
+    so no records are lost when it's rewritten. Threads should also hold a
+    `threading.Lock`, since how `flock` treats threads varies by platform.
+    """
+    with lock_path.open("ab") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def _walk_files(directory: str) -> Iterator[os.DirEntry]:
+    """Recursively yield entries for all files under a directory.
+
+    Unlike `Path.glob`, this doesn't create a `Path` for each entry.
+    """
+    for entry in os.scandir(directory):
+        if entry.is_dir(follow_symlinks=False):
+            yield from _walk_files(entry.path)
+        elif entry.is_file():
+            yield entry
+
+
+# Maximum number of files to checksum at once when repairing a Cache.
+MAX_CHECKSUM_WORKERS = os.cpu_count() or 1
+
+
+# When a Cache grows past its maximum size, files are evicted until it's at most
+# this fraction of its maximum size (so we don't need to evict on every add).
+CACHE_EVICTION_TARGET = 0.9
+
+# Directory in a cache where each Cache with a maximum size lists the files it's
+# using, so that other processes don't evict them. Each list is locked while its
+# Cache exists, so lists which aren't locked are left over and can be deleted.
+# Bucket names can't start with a dot, so this is never mistaken for a bucket.
+_IN_USE_DIRNAME = ".in_use"
+
+
 class Cache:
     """Interface to local cache of S3 objects."""
 
-    def __init__(self, cache_root: Path):
+    def __init__(self, cache_root: Path, max_bytes: int | None = None):
         """Create the cache interface.
 
         Parameters
         ----------
         cache_root
             Top level directory for the cache.
+        max_bytes, optional
+            If set, the least recently used files are evicted when the cache
+            grows larger than this. Files added or used through this `Cache`
+            are kept, even if that means going over. This should only be set
+            for caches whose files can be fetched again (i.e., not
+            FakeTracker's).
         """
         self._cache_root = cache_root.expanduser().resolve()
-        self._checksum_path = self._cache_root / "checksums.json"
-        self._cacheentry_by_checksum = self._load_checksums()
-
-    def _load_checksums(self) -> dict[str, list[CacheEntry]]:
-        if not self._checksum_path.exists():
-            return defaultdict(list)
-
-        checksum_bytes = self._checksum_path.read_bytes()
-        cache_entries = msgspec.json.decode(checksum_bytes, type=list[CacheEntry])
-
+        self._max_bytes = max_bytes
+        # Total size of cached files, computed when first needed.
+        self._size_bytes: int | None = None
+        # Files added or used through this Cache. These are never evicted, since
+        # callers may still be using them (e.g., other files in an artifact
+        # that's larger than the cache).
+        self._in_use: set[str] = set()
+        # Our list of files in use for other processes (see _IN_USE_DIRNAME),
+        # created when first needed.
+        self._in_use_file: BinaryIO | None = None
+        # Whether the last eviction ran out of files which aren't in use. Files
+        # added later are in use too, so there's no point in trying again.
+        self._nothing_to_evict = False
+        self._checksum_path = self._cache_root / "checksums.msgpack"
+        # Held while changing the checksum index or evicting files (see
+        # `_locked`).
+        self._lock_path = self._cache_root / "checksums.lock"
+        # Guards the checksum index so files can be added from multiple threads.
+        self._lock = threading.Lock()
         # There may be multiple CacheEntry objects for a single checksum.
         # Hash collisions are quite possible with identical files.
-        entries_by_checksum = defaultdict(list)
-        for entry in cache_entries:
-            entries_by_checksum[entry.checksum_sha1].append(entry)
+        self._cacheentry_by_checksum: dict[str, list[CacheEntry]] = defaultdict(list)
+        # The first entry for each S3 object and checksum, for fast lookups.
+        self._cacheentry_by_object_and_checksum: dict[
+            tuple[S3Object, str],
+            CacheEntry,
+        ] = {}
+        self._load_checksums()
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Keep other threads and processes from changing the cache."""
+        with self._lock:
+            self._cache_root.mkdir(parents=True, exist_ok=True)
+            with _file_lock(self._lock_path):
+                yield
+
+    def _load_checksums(self) -> None:
+        if not self._read_checksums():
+            return
+
+        # Other processes may have added entries since we read the index (or
+        # be partway through adding one, which looks like an incomplete record),
+        # so read it again once they're locked out.
+        with self._locked():
+            self._clear_index()
+            if self._read_checksums():
+                self._save_checksums()
+                self._checksum_path.with_suffix(".json").unlink(missing_ok=True)
+
+    def _read_checksums(self) -> bool:
+        """Add the entries in the checksum index on disk to our index.
+
+        Returns whether the index on disk needs to be rewritten.
+        """
+        # Older versions stored checksums as a single JSON list.
+        json_checksum_path = self._checksum_path.with_suffix(".json")
+        if self._checksum_path.exists():
+            checksum_bytes = self._checksum_path.read_bytes()
+            cache_entries, num_bytes_used = _decode_records(
+                _checksums_decoder,
+                checksum_bytes,
+            )
+            # Future records must not be appended after an incomplete one.
+            needs_rewrite = num_bytes_used < len(checksum_bytes)
+        elif json_checksum_path.exists():
+            cache_entries = msgspec.json.decode(
+                json_checksum_path.read_bytes(),
+                type=list[CacheEntry],
+            )
+            needs_rewrite = True
+        else:
+            cache_entries = []
+            needs_rewrite = False
 
-        return entries_by_checksum
+        num_added = sum(self._add_cacheentry(entry) for entry in cache_entries)
+        # Drop any duplicate records while we're at it.
+        return needs_rewrite or num_added < len(cache_entries)
 
     def _save_checksums(self) -> None:
+        """Rewrite the checksum index with a record for each entry.
+
+        Must be called with the cache locked.
+        """
         all_entries = []
         for entries in self._cacheentry_by_checksum.values():
             all_entries.extend(entries)
-        # Sort by repr() since entries can be mixed between S3Object and
-        # VersionedS3Object which don't compare with each other. This is purely
-        # to improve human readability of the resulting JSON -- nothing relies
-        # on this ordering.
-        all_entries.sort(key=lambda entry: repr(entry))
-        jsonified = msgspec.json.encode(all_entries)
+        # Sort for a deterministic file (nothing relies on this ordering). We
+        # use plain fields since entries can be mixed between S3Object and
+        # VersionedS3Object which don't compare with each other.
+        all_entries.sort(key=operator.attrgetter("cached_filename", "checksum_sha1"))
+        records = b"".join(
+            _encode_record(_checksums_encoder, entry) for entry in all_entries
+        )
 
-        self._cache_root.mkdir(parents=True, exist_ok=True)
-        with self._checksum_path.open("wb") as checksums:
-            checksums.write(jsonified)
+        new_checksum_path = self._checksum_path.with_suffix(".msgpack.tmp")
+        new_checksum_path.write_bytes(records)
+        new_checksum_path.replace(self._checksum_path)
 
     def get_path(
         self,
@@ -245,20 +601,14 @@ class Cache:
             Returns the S3 version as a string if the checksum was found for
             that S3 object, otherwise None.
         """
-        entries: list[CacheEntry] = self._cacheentry_by_checksum.get(sha1, [])
-        for entry in entries:
-            if entry.s3_object != s3_object:
-                continue
+        entry = self._cacheentry_by_object_and_checksum.get((s3_object, sha1))
+        if entry is None:
+            return None
 
-            # We've found the CacheEntry which matches checksum for this
-            # s3_object. Last part of a cached filename is the version_id
-            # (except when allow_unversioned=True, but these objects should
-            # never use this code path and allow_unversioned is not supported
-            # for other uses).
-            return Path(entry.cached_filename).parts[-1]
-
-        # No matching entries found.
-        return None
+        # Last part of a cached filename is the version_id (except when
+        # allow_unversioned=True, but these objects should never use this code
+        # path and allow_unversioned is not supported for other uses).
+        return Path(entry.cached_filename).parts[-1]
 
     def finalize_adding_file(
         self,
@@ -273,25 +623,180 @@ class Cache:
         sha1 can be provided if already calculated.
         """
         if last_modified:
+            # Access time is left as now since it's used to pick which files to
+            # evict.
             last_modified_tuple = time.mktime(last_modified.timetuple())
-            os.utime(cached_filename, (last_modified_tuple, last_modified_tuple))
+            os.utime(cached_filename, (time.time(), last_modified_tuple))
 
         # Make cache files read only.
         cached_filename.chmod(0o400)
 
-        self._make_cacheentry(
-            cached_filename=cached_filename,
-            s3_object=s3_object,
-            sha1=sha1,
-        )
-        self._save_checksums()
+        if sha1 is None:
+            sha1 = file_digest(cached_filename)
+
+        with self._locked():
+            entry = self._make_cacheentry(
+                cached_filename=cached_filename,
+                s3_object=s3_object,
+                sha1=sha1,
+            )
+            if entry is not None:
+                with self._checksum_path.open("ab") as checksums:
+                    checksums.write(_encode_record(_checksums_encoder, entry))
+
+            if self._max_bytes is not None:
+                self._mark_in_use(cached_filename)
+                if self._size_bytes is None:
+                    self._size_bytes = sum(size for _, _, size in self._file_stats())
+                elif entry is not None:
+                    # Otherwise the file was already in the cache (and counted).
+                    self._size_bytes += cached_filename.stat().st_size
+                if self._size_bytes > self._max_bytes and not self._nothing_to_evict:
+                    self._evict(self._max_bytes)
+
+    def mark_used(self, cached_filename: Path) -> bool:
+        """Record that a cached file is being used, so it won't be evicted.
+
+        Files can be marked before they're added to the cache, so that they
+        aren't evicted (by other processes) before they're finalized. This only
+        matters for caches with a maximum size.
+
+        Returns whether the file is in the cache (another process may have just
+        evicted it).
+        """
+        if self._max_bytes is None:
+            return cached_filename.exists()
+
+        with self._locked():
+            self._mark_in_use(cached_filename)
+            try:
+                # Keep the modification time (it's S3's modification time).
+                mtime_ns = cached_filename.stat().st_mtime_ns
+            except FileNotFoundError:
+                return False
+            os.utime(cached_filename, ns=(time.time_ns(), mtime_ns))
+            return True
+
+    def _mark_in_use(self, cached_filename: Path) -> None:
+        """Keep a file from being evicted. Must be called with the cache locked."""
+        filename = str(cached_filename)
+        if filename in self._in_use:
+            return
+        self._in_use.add(filename)
+
+        if self._in_use_file is None:
+            in_use_dir = self._cache_root / _IN_USE_DIRNAME
+            in_use_dir.mkdir(exist_ok=True)
+            in_use_fd, _ = tempfile.mkstemp(dir=in_use_dir)
+            self._in_use_file = os.fdopen(in_use_fd, "ab")
+            # Shared, since forked processes may share our list.
+            fcntl.flock(self._in_use_file, fcntl.LOCK_SH)
+        self._in_use_file.write(os.fsencode(filename) + b"\0")
+        self._in_use_file.flush()
+
+    def _files_in_use_elsewhere(self) -> set[str]:
+        """Return files in use by other Caches. Must be called with the cache locked."""
+        in_use_dir = self._cache_root / _IN_USE_DIRNAME
+        if not in_use_dir.exists():
+            return set()
+
+        filenames = set()
+        for in_use_path in in_use_dir.iterdir():
+            with in_use_path.open("rb") as in_use_file:
+                try:
+                    fcntl.flock(in_use_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # Its Cache still exists (perhaps it's ours).
+                    filenames.update(
+                        os.fsdecode(filename)
+                        for filename in in_use_file.read().split(b"\0")
+                        if filename
+                    )
+                else:
+                    in_use_path.unlink()
+        return filenames
+
+    def _walk_cached_files(self) -> Iterator[os.DirEntry]:
+        """Yield entries for all cached files."""
+        # Files in the root of the cache directory are cache metadata, so we
+        # only look in the bucket directories. Bucket names can't start with a
+        # dot, so those directories hold other things (e.g., Aeromancy's own
+        # state in AEROMANCY_STATE_DIR) which aren't ours to evict.
+        for entry in os.scandir(self._cache_root):
+            if entry.is_dir(follow_symlinks=False) and not entry.name.startswith("."):
+                yield from _walk_files(entry.path)
+
+    def _file_stats(self) -> Iterator[tuple[str, float, int]]:
+        """Yield the filename, access time, and size of each cached file."""
+        for file_entry in self._walk_cached_files():
+            try:
+                stat = file_entry.stat()
+            except FileNotFoundError:
+                # Deleted while we were looking (e.g., by an older version of
+                # Aeromancy, which didn't lock the cache while evicting).
+                continue
+            yield file_entry.path, stat.st_atime, stat.st_size
+
+    def _evict(self, max_bytes: int) -> None:
+        """Delete least recently used files until we're under our target size.
+
+        Must be called with the cache locked. Files which are in use (by any
+        process) aren't evicted.
+        """
+        # Other processes may have added entries since we read the index, which
+        # shouldn't be dropped when we rewrite it.
+        self._clear_index()
+        needs_rewrite = self._read_checksums()
+        in_use = self._in_use | self._files_in_use_elsewhere()
+
+        file_stats = sorted(self._file_stats(), key=operator.itemgetter(1))
+        self._size_bytes = sum(size for _, _, size in file_stats)
+        target_bytes = max_bytes * CACHE_EVICTION_TARGET
+
+        evicted_filenames = set()
+        for filename, _, size in file_stats:
+            if self._size_bytes <= target_bytes:
+                break
+            if filename in in_use:
+                continue
+            logger.info(f"Evicting {filename!r} from cache")
+            Path(filename).unlink(missing_ok=True)
+            evicted_filenames.add(filename)
+            self._size_bytes -= size
+        self._nothing_to_evict = self._size_bytes > target_bytes
+
+        if evicted_filenames:
+            self._remove_cacheentries(evicted_filenames)
+        if evicted_filenames or needs_rewrite:
+            self._save_checksums()
+
+    def _remove_cacheentries(self, cached_filenames: set[str]) -> None:
+        """Remove all `CacheEntry`s for files in `cached_filenames`."""
+        remaining_entries = [
+            entry
+            for entries in self._cacheentry_by_checksum.values()
+            for entry in entries
+            if entry.cached_filename not in cached_filenames
+        ]
+        self._clear_index()
+        for entry in remaining_entries:
+            self._add_cacheentry(entry)
+
+    def _clear_index(self) -> None:
+        """Remove all `CacheEntry`s (from memory, not disk)."""
+        self._cacheentry_by_checksum.clear()
+        self._cacheentry_by_object_and_checksum.clear()
 
     def _make_cacheentry(
         self,
         cached_filename: Path,
         s3_object: S3Object,
         sha1: str | None = None,
-    ):
+    ) -> CacheEntry | None:
+        """Add a `CacheEntry` for a file.
+
+        Returns the new entry or None if there was already an identical one.
+        """
         if sha1 is None:
             sha1 = file_digest(cached_filename)
 
@@ -300,25 +805,93 @@ class Cache:
             checksum_sha1=sha1,
             cached_filename=str(cached_filename),
         )
-        self._cacheentry_by_checksum[sha1].append(entry)
+        return entry if self._add_cacheentry(entry) else None
+
+    def _add_cacheentry(self, entry: CacheEntry) -> bool:
+        """Add `entry` to the index unless it's already there.
+
+        Returns whether `entry` was added.
+        """
+        entries = self._cacheentry_by_checksum[entry.checksum_sha1]
+        if entry in entries:
+            return False
+        entries.append(entry)
+        self._cacheentry_by_object_and_checksum.setdefault(
+            (entry.s3_object, entry.checksum_sha1),
+            entry,
+        )
+        return True
 
     def repair(self) -> None:
         """Delete and regenerate the checksum cache."""
-        self._cacheentry_by_checksum.clear()
-        for filename in sorted(self._cache_root.glob("**/*")):
-            # Skip files in the root of the cache directory (these are cache
-            # metadata).
-            if not filename.is_file() or filename.parent == self._cache_root:
-                continue
-            logger.info(f"Checksumming {str(filename)!r}")
-            relative_filename = Path(str(filename).replace(f"{self._cache_root}/", ""))
+        self._clear_index()
+        cached_files: list[tuple[Path, S3Object]] = []
+        filenames = [file_entry.path for file_entry in self._walk_cached_files()]
+        for filename in sorted(filenames):
+            cached_filename = Path(filename)
+            relative_filename = cached_filename.relative_to(self._cache_root)
             [bucket, *key_parts, version_id] = relative_filename.parts
             key = "/".join(key_parts)
-            self._make_cacheentry(
-                cached_filename=filename,
-                s3_object=S3Object(bucket=bucket, key=key),
-            )
-        self._save_checksums()
+            cached_files.append((cached_filename, S3Object(bucket=bucket, key=key)))
+
+        def checksum(filename: Path) -> str:
+            logger.info(f"Checksumming {str(filename)!r}")
+            return file_digest(filename)
+
+        # hashlib releases the GIL while hashing, so files can be checksummed in
+        # parallel.
+        with ThreadPoolExecutor(max_workers=MAX_CHECKSUM_WORKERS) as executor:
+            sha1s = executor.map(checksum, (filename for filename, _ in cached_files))
+            for (filename, s3_object), sha1 in zip(cached_files, sha1s, strict=True):
+                self._make_cacheentry(
+                    cached_filename=filename,
+                    s3_object=s3_object,
+                    sha1=sha1,
+                )
+        with self._locked():
+            self._save_checksums()
+
+
+# Maximum number of simultaneous connections each S3Client keeps open. Callers
+# transferring files from multiple threads shouldn't use more threads than this.
+MAX_CONNECTIONS = 32
+
+# How large files are split up when transferring them. Larger parts than the
+# default (8 MiB) mean fewer requests for large artifacts, with each file's
+# parts transferred over several connections at once.
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=16 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=10,
+)
+
+
+# If set, the maximum size of the S3 cache (e.g., "50 GB" or "50000000000").
+CACHE_MAX_BYTES_ENV = "AEROMANCY_CACHE_MAX_BYTES"
+
+
+def _parse_cache_max_bytes(cache_max_bytes: str | None) -> int | None:
+    """Parse the value of `CACHE_MAX_BYTES_ENV` (if it's set)."""
+    if not cache_max_bytes:
+        return None
+    error = ValueError(
+        f"Couldn't parse {CACHE_MAX_BYTES_ENV}={cache_max_bytes!r} (expected a "
+        'number of bytes, optionally with a unit like "50 GB" or "50GB")',
+    )
+    # The space between the number and unit is optional.
+    match = re.fullmatch(r"\s*([0-9.]+)\s*([A-Za-z]*)\s*", cache_max_bytes)
+    if match is None:
+        raise error
+    number, unit = match.groups()
+    multiplier = {"": 1, "KB": 10**3, "MB": 10**6, "GB": 10**9, "TB": 10**12}.get(
+        unit.upper(),
+    )
+    if multiplier is None:
+        raise error
+    try:
+        return int(float(number) * multiplier)
+    except ValueError as err:
+        raise error from err
 
 
 class S3Client:
@@ -331,6 +904,7 @@ class S3Client:
         aws_access_key_id,
         aws_secret_access_key,
         cache_root="~/Cache/",
+        cache_max_bytes: int | None = None,
     ):
         """Create a client for working with S3 storage.
 
@@ -339,6 +913,9 @@ class S3Client:
 
         cache_root is where our bucket cache should live on disk. By default, it
         persists in your home directory.
+
+        If cache_max_bytes is set, the least recently used cached files are
+        evicted to keep the cache from growing (much) larger than this.
         """
         self._s3_client = boto3.client(
             "s3",
@@ -346,8 +923,19 @@ class S3Client:
             endpoint_url=endpoint_url,
             aws_access_key_id=aws_access_key_id,
             aws_secret_access_key=aws_secret_access_key,
+            config=botocore.config.Config(
+                # The default pool (10) is smaller than the number of threads we
+                # use for parallel transfers.
+                max_pool_connections=MAX_CONNECTIONS,
+                # Keeps idle pooled connections alive between (e.g., sequential)
+                # transfers so they don't need new TLS handshakes.
+                tcp_keepalive=True,
+                # Parallel transfers can get throttled ("503 Slow Down"). Adaptive
+                # retries back off and rate limit all threads sharing this client.
+                retries={"max_attempts": 10, "mode": "adaptive"},
+            ),
         )
-        self.cache = Cache(Path(cache_root))
+        self.cache = Cache(Path(cache_root), max_bytes=cache_max_bytes)
 
     @classmethod
     def from_env_variables(cls):
@@ -363,6 +951,9 @@ class S3Client:
                 aws_secret_access_key=os.environ["AEROMANCY_AWS_SECRET_ACCESS_KEY"],
                 region_name=os.environ.get("AEROMANCY_AWS_REGION", ""),
                 endpoint_url=os.environ["AEROMANCY_AWS_S3_ENDPOINT_URL"],
+                cache_max_bytes=_parse_cache_max_bytes(
+                    os.environ.get(CACHE_MAX_BYTES_ENV),
+                ),
             )
         return _S3_CLIENT
 
@@ -371,7 +962,8 @@ class S3Client:
 
         Raises a TypeError if s3_object doesn't have a version.
         """
-        response = self._s3_client.get_object(
+        # We only need metadata, so avoid starting to download the object.
+        response = self._s3_client.head_object(
             Bucket=s3_object.bucket,
             Key=s3_object.key,
         )
@@ -403,11 +995,13 @@ class S3Client:
         # Determine where it should live in the cache. Note the key will
         # actually become a directory here so we can group all its versions
         # together.
-        cached_filename: Path = self.cache.get_path(s3_object)
-        if cached_filename.exists():
+        cached_filename: Path = self.cache.get_path(s3_object, create_parents=False)
+        # This also keeps it from being evicted before we've finished adding it.
+        if self.cache.mark_used(cached_filename):
             return cached_filename
 
         logger.info(f"Fetching and caching {s3_object!r}")
+        cached_filename.parent.mkdir(parents=True, exist_ok=True)
 
         # Actually download the file.
         download_kwargs = {}
@@ -417,19 +1011,21 @@ class S3Client:
             s3_object.bucket,
             s3_object.key,
             cached_filename,
+            Config=TRANSFER_CONFIG,
             **download_kwargs,
         )
 
-        # Set modification (and access) time to S3's modification time. This
-        # helps with debugging and also means they'll sort by version easily
-        # with tools like "ls -lt".
-        get_object_kwargs = {}
+        # Set modification time to S3's modification time. This helps with
+        # debugging and also means they'll sort by version easily with tools
+        # like "ls -lt". (Access time is set to now, since it's used to pick
+        # which files to evict.)
+        head_object_kwargs = {}
         if versioned:
-            get_object_kwargs["VersionId"] = s3_object.version_id
-        response = self._s3_client.get_object(
+            head_object_kwargs["VersionId"] = s3_object.version_id
+        response = self._s3_client.head_object(
             Bucket=s3_object.bucket,
             Key=s3_object.key,
-            **get_object_kwargs,
+            **head_object_kwargs,
         )
         last_modified: datetime = response["LastModified"]
 
@@ -440,6 +1036,23 @@ class S3Client:
         )
         return cached_filename
 
+    def fetch_bytes(self, s3_object: VersionedS3Object) -> bytes:
+        """Return the contents of an object without adding it to our cache.
+
+        This is intended for small objects that are only needed once. If the
+        object is already cached, the cached copy is used.
+        """
+        cached_filename: Path = self.cache.get_path(s3_object, create_parents=False)
+        if cached_filename.exists() and self.cache.mark_used(cached_filename):
+            return cached_filename.read_bytes()
+
+        response = self._s3_client.get_object(
+            Bucket=s3_object.bucket,
+            Key=s3_object.key,
+            VersionId=s3_object.version_id,
+        )
+        return response["Body"].read()
+
     def put(
         self,
         local_filename: Path,
@@ -455,7 +1068,12 @@ class S3Client:
         existing_version_id = self.cache.get_version(s3_object=s3_object, sha1=sha1)
         if existing_version_id is None:
             logger.info(f"Storing {str(local_filename)!r} ({size}) to {s3_object}")
-            self._s3_client.upload_file(local_filename, s3_object.bucket, s3_object.key)
+            self._s3_client.upload_file(
+                local_filename,
+                s3_object.bucket,
+                s3_object.key,
+                Config=TRANSFER_CONFIG,
+            )
             # TODO: there's a potential race condition here if two uploads of the same
             # file happens simultaneously.
             version_id = self.latest_version(s3_object)
@@ -474,7 +1092,9 @@ class S3Client:
         # Transfer it to the cache if it's not already there.
         if not existing_version_id:
             cached_filename = self.cache.get_path(versioned_s3_object)
-            shutil.copy(local_filename, cached_filename)
+            # Keep it from being evicted before we've finished adding it.
+            self.cache.mark_used(cached_filename)
+            fast_copy(local_filename, cached_filename)
 
             self.cache.finalize_adding_file(
                 s3_object=s3_object,
@@ -514,11 +1134,16 @@ class S3Client:
         if not pseudodirectory.endswith("/"):
             pseudodirectory += "/"
 
-        all_keys = sorted(
-            list_objects_iterator(self._s3_client, str(bucket), pseudodirectory),
-        )
+        # S3 lists keys in UTF-8 byte order, which matches Python's (code point)
+        # string ordering, so these are already sorted.
         return [
-            S3Object(str(bucket), key) for key in all_keys if key != pseudodirectory
+            S3Object(str(bucket), key)
+            for key in list_objects_iterator(
+                self._s3_client,
+                str(bucket),
+                pseudodirectory,
+            )
+            if key != pseudodirectory
         ]
 
     def ensure_object_versioning(self, bucket: S3Bucket | str) -> None:
@@ -535,8 +1160,6 @@ class S3Client:
 
 
 if __name__ == "__main__":
-    import sys
-
     # TODO: simple function for now -- will likely grow to include other S3 debug
     # operations
     print("Repairing S3 cache checksums")
@@ -549,11 +1172,11 @@ if __name__ == "__main__":
 
         try:
             cache = Cache(cache_path)
-        except msgspec.ValidationError:
-            # This happens with older databases, so nuke the checksums and
-            # retry (repair is going to rebuild them anyway).
-            checksum_path = cache_path / "checksums.json"
-            checksum_path.unlink()
+        except msgspec.DecodeError:
+            # This happens with older (or corrupted) databases, so nuke the
+            # checksums and retry (repair is going to rebuild them anyway).
+            for checksum_filename in ("checksums.msgpack", "checksums.json"):
+                (cache_path / checksum_filename).unlink(missing_ok=True)
             cache = Cache(cache_path)
 
         cache.repair()
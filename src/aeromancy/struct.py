@@ -1,6 +1,6 @@
 """Extended version of `msgspec.Struct` with easier serialization and validation."""
 
-import json
+import functools
 import tempfile
 from pathlib import Path
 from typing import TypeAlias
@@ -15,6 +15,26 @@ JSONType: TypeAlias = (
     dict[str, "JSONType"] | list["JSONType"] | str | int | float | bool | None
 )
 
+# Reused codecs, since creating these is considerably slower than using them.
+# (msgspec.yaml only provides functions.)
+_json_encoder = msgspec.json.Encoder()
+_msgpack_encoder = msgspec.msgpack.Encoder()
+
+
+@functools.cache
+def _decoder(
+    cls: type[msgspec.Struct],
+    format: str,
+) -> msgspec.json.Decoder | msgspec.msgpack.Decoder:
+    """Fetch a decoder for `cls` in `format` ("json" or "msgpack")."""
+    match format:
+        case "json":
+            return msgspec.json.Decoder(cls)
+        case "msgpack":
+            return msgspec.msgpack.Decoder(cls)
+        case _:
+            raise ValueError(f"Unknown format: {format!r}")
+
 
 class AeromancyStruct(msgspec.Struct):
     """`msgspec.Struct` baseclass with additional features.
@@ -39,9 +59,9 @@ class AeromancyStruct(msgspec.Struct):
             case "yaml":
                 encoded = msgspec.yaml.encode(self)
             case "json":
-                encoded = msgspec.json.encode(self)
+                encoded = _json_encoder.encode(self)
             case "msgpack":
-                encoded = msgspec.msgpack.encode(self)
+                encoded = _msgpack_encoder.encode(self)
             case _:
                 raise ValueError(f"Unknown format: {format!r}")
 
@@ -66,10 +86,8 @@ class AeromancyStruct(msgspec.Struct):
         match format:
             case "yaml":
                 return msgspec.yaml.decode(encoded_bytes, type=cls)
-            case "json":
-                return msgspec.json.decode(encoded_bytes, type=cls)
-            case "msgpack":
-                return msgspec.msgpack.decode(encoded_bytes, type=cls)
+            case "json" | "msgpack":
+                return _decoder(cls, format).decode(encoded_bytes)
             case _:
                 raise ValueError(f"Unknown format: {format!r}")
 
@@ -83,13 +101,19 @@ class AeromancyStruct(msgspec.Struct):
         """
         # TODO: May eventually be part of msgspec:
         #   https://github.com/jcrist/msgspec/issues/513
-        # In the meantime, a workaround: msgspec validates only on
-        # serialization, so we can roundtrip our data.
-        self.decode(self.encode(format="msgpack"), format="msgpack")
+        # In the meantime, a workaround: msgspec validates only when converting
+        # or decoding, so we can roundtrip our data (through builtin Python
+        # objects, which avoids encoding to bytes).
+        msgspec.convert(msgspec.to_builtins(self), type=type(self))
 
     def as_json_objects(self) -> JSONType:
-        """Encode this structure as JSON using corresponding Python objects."""
-        return json.loads(self.encode(format="json"))
+        """Encode this structure as JSON using corresponding Python objects.
+
+        Note that non-finite floats (NaN and infinities) are kept as they are.
+        """
+        # Converting directly is considerably faster than encoding to JSON and
+        # decoding it again. str_keys matches JSON, where keys must be strings.
+        return msgspec.to_builtins(self, str_keys=True)
 
     def to_artifact(
         self,
@@ -14,7 +14,7 @@ runs and indicate a larger scope.
 """
 
 from abc import ABC, abstractmethod
-from collections.abc import Sequence
+from collections.abc import Iterator, Sequence
 from pathlib import Path
 from typing import Any
 
@@ -71,7 +71,9 @@ class Tracker(ABC):
         self.config = config
         self.job_type = job_type
         self.job_group = job_group
-        self.tags = tags or set()
+        # Copied since subclasses add their own tags and callers (e.g.,
+        # `ActionRunner`) share one set across many Trackers.
+        self.tags = set(tags) if tags else set()
 
     @abstractmethod
     def __enter__(self):
@@ -156,6 +158,30 @@ class Tracker(ABC):
         """
         raise NotImplementedError
 
+    def declare_input_streaming(
+        self,
+        artifact: AeromancyArtifact | str,
+        use_as: str | None = None,
+    ) -> Iterator[Path]:
+        """Declare that this run depends on an existing artifact, streaming paths.
+
+        Like `declare_input`, but local paths may be yielded as soon as each file
+        is available (so not necessarily in order). By default, this just yields
+        the results of `declare_input`.
+
+        Parameters
+        ----------
+        artifact
+            An existing AeromancyArtifact or a W&B full name.
+        use_as, optional
+            Additional metadata to track how this is being used.
+
+        Yields
+        ------
+            Local paths to the artifact.
+        """
+        yield from self.declare_input(artifact, use_as)
+
     @abstractmethod
     def log(self, metrics: dict[str, Any]) -> None:
         """Record a set of metrics to be associated with this run.
@@ -3,12 +3,11 @@
 Weights and Biases is used to track runs and S3 to store artifacts.
 """
 
-from collections.abc import Sequence
+import functools
+from collections.abc import Iterator, Sequence
 from pathlib import Path
 from typing import Any
 
-import wandb
-import wandb.sdk.wandb_run
 from loguru import logger
 from typing_extensions import override
 
@@ -18,6 +17,20 @@ from aeromancy.s3 import S3Object
 from aeromancy.tracker import Tracker
 
 
+@functools.cache
+def _load_docker_package_versions() -> tuple[tuple[str, str], ...]:
+    """Read the (package name, version) pairs installed in our Docker image."""
+    # packages_list.txt is created as part of Docker image construciton, so it
+    # won't change while we're running.
+    with Path("/base/packages_list.txt").open() as packages_list:
+        package_versions = []
+        for line in packages_list:
+            package_name, _, version = line.rstrip("\n").partition("=")
+            if package_name:
+                package_versions.append((package_name, version))
+    return tuple(package_versions)
+
+
 class WandbTracker(Tracker):
     """A single, logged piece of computation.
 
@@ -34,6 +47,11 @@ class WandbTracker(Tracker):
         tags: set[str] | None = None,
         quiet: bool = True,
     ):
+        # Imported here since wandb is slow to import and only needed once
+        # we're actually tracking with it.
+        import wandb
+        import wandb.sdk.wandb_run
+
         Tracker.__init__(
             self,
             project_name=project_name,
@@ -88,11 +106,11 @@ class WandbTracker(Tracker):
 
     def _log_docker_package_versions(self):
         """Log all Docker package versions as a Weights and Biases Table artifact."""
-        # packages_list.txt is created as part of Docker image construciton.
-        packages_list = Path("/base/packages_list.txt").read_text()
-        rows = [line.split("=", 1) for line in packages_list.splitlines()]
+        import wandb
+
         package_version_table = wandb.Table(
-            data=rows,
+            # Copied since wandb.Table may hold onto (or modify) its rows.
+            data=[list(row) for row in _load_docker_package_versions()],
             columns=["package_name", "version"],
         )
         self.wandb_run.log(
@@ -136,6 +154,14 @@ class WandbTracker(Tracker):
     ) -> Sequence[Path]:
         return self._artifacts.declare_input(artifact, use_as)
 
+    @override
+    def declare_input_streaming(
+        self,
+        artifact: AeromancyArtifact | str,
+        use_as: str | None = None,
+    ) -> Iterator[Path]:
+        return self._artifacts.declare_input_streaming(artifact, use_as)
+
     @override
     def log(self, metrics: dict[str, Any]):
-        wandb.log(metrics)
+        self.wandb_run.log(metrics)
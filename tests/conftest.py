@@ -1 +1,13 @@
 """Configuration for the pytest test suite."""
+
+import pytest
+
+from aeromancy.runtime_environment import get_runtime_environment
+
+
+@pytest.fixture(autouse=True)
+def _fresh_runtime_environment():
+    """Ensure each test starts with a newly created `RuntimeEnvironment`."""
+    get_runtime_environment.cache_clear()
+    yield
+    get_runtime_environment.cache_clear()
@@ -0,0 +1,423 @@
+"""Tests for Aeromancy `Action`s."""
+
+import multiprocessing
+import os
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, ClassVar
+
+import pydot
+import pytest
+from typing_extensions import override
+
+from aeromancy import action_runner
+from aeromancy.action import Action, _BackgroundLoggingTracker
+from aeromancy.action_builder import ActionBuilder, _topological_sort
+from aeromancy.runtime_environment import (
+    _ensure_valid_environment,
+    get_runtime_environment,
+)
+from aeromancy.tracker import Tracker
+
+_ensure_valid_environment()
+
+
+class CountingAction(Action):
+    """Simple `Action` which counts how many times `outputs` is called."""
+
+    job_type = "counting"
+
+    @override
+    def __init__(self, parents: list[Action], **config):
+        Action.__init__(self, parents, **config)
+        self.outputs_calls = 0
+
+    @override
+    def outputs(self) -> list[str]:
+        self.outputs_calls += 1
+        return [f"counting-{self.config['name']}"]
+
+
+class CountingActionBuilder(ActionBuilder):
+    """Simple `ActionBuilder` with a parent and child `CountingAction`."""
+
+    @override
+    def build_actions(self) -> list[Action]:
+        actions = []
+        parent = self.add_action(actions, CountingAction(parents=[], name="parent"))
+        self.add_action(actions, CountingAction(parents=[parent], name="child"))
+        return actions
+
+
+def test_cached_outputs() -> None:
+    """Ensure `cached_outputs` only calls `outputs` once."""
+    action = CountingAction(parents=[], name="a")
+    assert action.cached_outputs() == ["counting-a"]
+    assert action.cached_outputs() == ["counting-a"]
+    assert action.outputs_calls == 1
+
+
+def test_task_deps() -> None:
+    """Ensure `task_deps` collects parent outputs when added to a builder."""
+    builder = CountingActionBuilder(project_name="project")
+    actions = builder.build_actions()
+    parent, child = actions
+
+    assert parent.task_deps() == []
+    assert child.task_deps() == ["counting-parent"]
+    assert parent.outputs_calls == 1
+
+
+def test_get_io() -> None:
+    """Basic test for `get_io` method."""
+    get_runtime_environment().artifact_overrides = []
+
+    parent = CountingAction(parents=[], name="parent")
+    child = CountingAction(parents=[parent], name="child")
+    child._set_buildtime_properties(project_name="project", skip=False)
+
+    assert child.get_io() == (["project/counting-parent:latest"], ["counting-child"])
+    assert child.get_io(resolve_outputs=True) == (
+        ["project/counting-parent:latest"],
+        ["project/counting-child:latest"],
+    )
+    assert parent.outputs_calls == 1
+    assert child.outputs_calls == 1
+
+
+def test_get_io_returns_copies() -> None:
+    """Ensure modifying the results of `get_io` doesn't affect later calls."""
+    get_runtime_environment().artifact_overrides = []
+
+    action = CountingAction(parents=[], name="a")
+    action._set_buildtime_properties(project_name="project", skip=False)
+
+    _, outputs = action.get_io()
+    outputs.append("bogus")
+    assert action.get_io() == ([], ["counting-a"])
+
+
+def test_load_tasks_is_cached() -> None:
+    """Ensure `load_tasks` reuses tasks until runtime settings change."""
+    runner = CountingActionBuilder(project_name="project").to_runner()
+    tasks = runner.load_tasks()
+    assert [task.name for task in tasks] == ["counting-parent", "counting-child"]
+    assert tasks[1].task_dep == ["counting-parent"]
+    assert runner.load_tasks() == tasks
+
+    runner.job_tags = {"tag"}
+    rebuilt_tasks = runner.load_tasks()
+    assert [task.name for task in rebuilt_tasks] == [task.name for task in tasks]
+    assert rebuilt_tasks[0] is not tasks[0]
+
+
+def test_fingerprint_changes_with_config() -> None:
+    """Ensure `Action` fingerprints depend on config."""
+    action1 = CountingAction(parents=[], name="a", alpha=1)
+    action2 = CountingAction(parents=[], name="a", alpha=1)
+    action3 = CountingAction(parents=[], name="a", alpha=2)
+    for action in (action1, action2, action3):
+        action._set_buildtime_properties(project_name="project", skip=False)
+
+    assert action1._fingerprint() == action2._fingerprint()
+    assert action1._fingerprint() != action3._fingerprint()
+
+
+def test_fingerprint_changes_with_parents() -> None:
+    """Ensure changes to a parent `Action` change its children's fingerprints."""
+    parent1 = CountingAction(parents=[], name="parent", alpha=1)
+    parent2 = CountingAction(parents=[], name="parent", alpha=2)
+    child1 = CountingAction(parents=[parent1], name="child")
+    child2 = CountingAction(parents=[parent2], name="child")
+    for action in (parent1, parent2, child1, child2):
+        action._set_buildtime_properties(project_name="project", skip=False)
+
+    assert child1._fingerprint() != child2._fingerprint()
+
+
+def test_fingerprint_unsupported_config() -> None:
+    """Ensure `Action`s with configs we can't summarize aren't fingerprinted."""
+    action = CountingAction(parents=[], name="a", value=object())
+    action._set_buildtime_properties(project_name="project", skip=False)
+    assert action._fingerprint() is None
+
+
+def test_fingerprint_path_config() -> None:
+    """Ensure paths in configs are fingerprinted by value."""
+    action1 = CountingAction(parents=[], name="a", path=Path("data/1"))
+    action2 = CountingAction(parents=[], name="a", path=Path("data/2"))
+    for action in (action1, action2):
+        action._set_buildtime_properties(project_name="project", skip=False)
+
+    assert action1._fingerprint() is not None
+    assert action1._fingerprint() != action2._fingerprint()
+
+
+class RunRecordingTracker(Tracker):
+    """`Tracker` for `RunRecordingAction`s which doesn't record anything itself."""
+
+    @override
+    def __enter__(self):
+        return self
+
+    @override
+    def __exit__(self, exctype, excinst, exctb) -> bool:
+        return False
+
+    @override
+    def declare_output(self, *args, **kwargs):
+        raise NotImplementedError
+
+    @override
+    def declare_input(self, *args, **kwargs):
+        raise NotImplementedError
+
+    @override
+    def log(self, metrics: dict[str, Any]) -> None:
+        raise NotImplementedError
+
+
+class RunRecordingAction(CountingAction):
+    """`CountingAction` which records the names of `Action`s when they're run."""
+
+    runs: ClassVar[list[str]] = []
+
+    @override
+    def run(self, tracker: Tracker) -> None:
+        self.runs.append(self.config["name"])
+
+
+class RunRecordingActionBuilder(ActionBuilder):
+    """Simple `ActionBuilder` with a parent and child `RunRecordingAction`."""
+
+    @override
+    def build_actions(self) -> list[Action]:
+        actions = []
+        parent = self.add_action(actions, RunRecordingAction(parents=[], name="parent"))
+        self.add_action(actions, RunRecordingAction(parents=[parent], name="child"))
+        for action in actions:
+            action._set_tracker(RunRecordingTracker)
+        return actions
+
+
+def test_children_rerun_after_parents(tmp_path, monkeypatch) -> None:
+    """Ensure `Action`s run again whenever their parents run (e.g., via `only`)."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+
+    def run_actions(only: set[str] | None = None) -> list[str]:
+        RunRecordingAction.runs = []
+        runner = RunRecordingActionBuilder(project_name="project").to_runner()
+        runner.run_actions(only=only, graph=False, list_actions=False, tags=None)
+        return RunRecordingAction.runs
+
+    assert run_actions() == ["parent", "child"]
+    assert run_actions() == []
+    assert run_actions(only={"parent"}) == ["parent"]
+    assert run_actions() == ["child"]
+    assert run_actions() == []
+
+
+class ParallelGroupAction(CountingAction):
+    """`CountingAction` in a `max_parallel_group` which records when it ran."""
+
+    max_parallel_group = "group"
+
+    @override
+    def run(self, tracker: Tracker) -> None:
+        # Workers are separate processes, so runs are recorded in files.
+        start = time.time()
+        time.sleep(0.5)
+        (Path.home() / self.config["name"]).write_text(f"{start} {time.time()}")
+
+
+class ParallelGroupActionBuilder(ActionBuilder):
+    """`ActionBuilder` with two independent `ParallelGroupAction`s."""
+
+    @override
+    def build_actions(self) -> list[Action]:
+        actions = []
+        for name in ("first", "second"):
+            action = ParallelGroupAction(parents=[], name=name)
+            self.add_action(actions, action)
+            action._set_tracker(RunRecordingTracker)
+        return actions
+
+
+@pytest.mark.parametrize("start_method", ["fork", "spawn"])
+def test_max_parallel_group(tmp_path, monkeypatch, start_method) -> None:
+    """Ensure `Action`s sharing a `max_parallel_group` don't run at the same time."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    previous_start_method = multiprocessing.get_start_method(allow_none=True)
+    multiprocessing.set_start_method(start_method, force=True)
+    try:
+        runner = ParallelGroupActionBuilder(project_name="project").to_runner()
+        runner.run_actions(
+            only=None,
+            graph=False,
+            list_actions=False,
+            tags=None,
+            workers=2,
+        )
+    finally:
+        multiprocessing.set_start_method(previous_start_method, force=True)
+
+    [(_, first_end), (second_start, _)] = sorted(
+        tuple(map(float, (tmp_path / name).read_text().split()))
+        for name in ("first", "second")
+    )
+    assert first_end <= second_start
+
+
+class RecordingTracker(Tracker):
+    """Minimal `Tracker` which records logged metrics."""
+
+    @override
+    def __init__(self):
+        Tracker.__init__(self, project_name="project")
+        self.logged: list[dict[str, Any]] = []
+
+    @override
+    def __enter__(self):
+        return self
+
+    @override
+    def __exit__(self, exctype, excinst, exctb) -> bool:
+        return False
+
+    @override
+    def declare_output(self, *args, **kwargs):
+        raise NotImplementedError
+
+    @override
+    def declare_input(self, *args, **kwargs):
+        raise NotImplementedError
+
+    @override
+    def log(self, metrics: dict[str, Any]) -> None:
+        if "fail" in metrics:
+            raise RuntimeError("Failed to log")
+        self.logged.append(metrics)
+
+
+def test_background_logging_tracker_preserves_order() -> None:
+    """Ensure metrics are sent separately and in order."""
+    recording_tracker = RecordingTracker()
+    logging_tracker = _BackgroundLoggingTracker(recording_tracker)
+    metrics = {"step": 0}
+    for step in range(100):
+        metrics["step"] = step
+        logging_tracker.log(metrics)
+    assert logging_tracker.close() is None
+
+    assert recording_tracker.logged == [{"step": step} for step in range(100)]
+    assert logging_tracker.project_name == "project"
+
+
+def test_background_logging_tracker_returns_errors() -> None:
+    """Ensure errors from the background thread are returned by `close`."""
+    logging_tracker = _BackgroundLoggingTracker(RecordingTracker())
+    logging_tracker.log({"fail": True})
+    assert isinstance(logging_tracker.close(), RuntimeError)
+
+
+def test_topological_sort() -> None:
+    """Ensure `Action`s are sorted so parents come before their children."""
+    parent = CountingAction(parents=[], name="parent")
+    child = CountingAction(parents=[parent], name="child")
+    grandchild = CountingAction(parents=[child, parent], name="grandchild")
+    other = CountingAction(parents=[], name="other")
+
+    assert _topological_sort([grandchild, other, child, parent]) == [
+        other,
+        parent,
+        child,
+        grandchild,
+    ]
+
+
+def test_topological_sort_detects_cycles() -> None:
+    """Ensure cycles between `Action`s are reported."""
+    action1 = CountingAction(parents=[], name="1")
+    action2 = CountingAction(parents=[action1], name="2")
+    action1.parents.append(action2)
+
+    with pytest.raises(ValueError, match="cycle"):
+        _topological_sort([action1, action2])
+
+
+def test_only_filter() -> None:
+    """Ensure `only` matches job names containing any of its substrings."""
+    runner = CountingActionBuilder(project_name="project").to_runner()
+    with pytest.raises(SystemExit):
+        runner.run_actions(
+            only={" par", "a.b"},
+            graph=False,
+            list_actions=True,
+            tags=None,
+        )
+
+    assert runner.job_name_filter is not None
+    assert runner.job_name_filter("counting-parent")
+    assert runner.job_name_filter("xa.by")
+    assert not runner.job_name_filter("counting-child")
+    assert not runner.job_name_filter("axb")
+
+
+def test_render_graph_dot(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Ensure the DOT passed to Graphviz describes all tasks and dependencies."""
+    dot_inputs = []
+
+    def fake_run(args, input, **kwargs):
+        dot_inputs.append(input.decode())
+        return subprocess.CompletedProcess(args, 0, stdout=b"png")
+
+    monkeypatch.setattr(action_runner.subprocess, "run", fake_run)
+    runner = CountingActionBuilder(project_name="project").to_runner()
+    assert runner._render_graph(runner.load_tasks()) == b"png"
+
+    (graph,) = pydot.graph_from_dot_data(dot_inputs[0])
+    assert [node.get_name() for node in graph.get_nodes()] == [
+        '"counting-parent"',
+        '"counting-child"',
+    ]
+    assert graph.get_nodes()[0].get_label() == '"counting | counting-parent"'
+    (edge,) = graph.get_edges()
+    assert (edge.get_source(), edge.get_destination()) == (
+        '"counting-parent"',
+        '"counting-child"',
+    )
+
+
+def test_graph_png_cache(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Ensure rendered graphs are reused and only recent ones are kept."""
+    monkeypatch.setattr(action_runner, "GRAPH_CACHE_DIR", tmp_path)
+    monkeypatch.setattr(action_runner, "MAX_CACHED_GRAPHS", 2)
+    renders = []
+
+    def fake_render_graph(tasks):
+        renders.append(tasks[0].name)
+        return tasks[0].name.encode()
+
+    monkeypatch.setattr(
+        action_runner.ActionRunner,
+        "_render_graph",
+        staticmethod(fake_render_graph),
+    )
+
+    def graph_png(name: str) -> bytes:
+        action = CountingAction(parents=[], name=name)
+        action._set_buildtime_properties(project_name="project", skip=False)
+        return action_runner.ActionRunner([action])._graph_png()
+
+    for name in ("a", "b", "a", "c"):
+        assert graph_png(name) == f"counting-{name}".encode()
+        if name == "b":
+            # Make sure later uses are more recent, even with coarse mtimes.
+            for png_path in tmp_path.glob("*.png"):
+                os.utime(png_path, (0, 0))
+    assert renders == ["counting-a", "counting-b", "counting-c"]
+    # "b" was the least recently used graph, so it's no longer cached.
+    assert len(list(tmp_path.glob("*.png"))) == 2
+    assert graph_png("b") == b"counting-b"
+    assert renders[-1] == "counting-b"
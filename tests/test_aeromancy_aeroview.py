@@ -0,0 +1,27 @@
+"""Tests for the aeroview artifact viewer."""
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from aeromancy.aeroview import describe_table
+
+
+def test_describe_table() -> None:
+    """Ensure `describe_table` matches `pd.DataFrame.describe`."""
+    df = pd.DataFrame(
+        {
+            "ints": [1, 2, 3, 4],
+            "floats": [0.5, None, 2.5, 4.0],
+            "strings": ["a", "b", "c", "d"],
+        },
+    )
+    described = describe_table(pa.Table.from_pandas(df))
+    expected = df.describe()
+
+    assert list(described.columns) == ["ints", "floats"]
+    assert list(described.index) == list(expected.index)
+    for column in described.columns:
+        assert described[column].to_numpy() == pytest.approx(
+            expected[column].to_numpy(),
+        )
@@ -1,17 +1,24 @@
 """Tests for working with Aeromancy Artifacts."""
 
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
 import pytest
 
+from aeromancy import artifacts as artifacts_module
 from aeromancy.artifacts import (
     AeromancyArtifact,
+    Artifacts,
     WandbArtifactName,
+    _map_transfers,
     _validate_wandb_artifact_string,
 )
 from aeromancy.runtime_environment import (
     _ensure_valid_environment,
     get_runtime_environment,
 )
-from aeromancy.s3 import VersionedS3Object
+from aeromancy.s3 import S3Object, VersionedS3Object
 
 _ensure_valid_environment()
 
@@ -82,7 +89,15 @@ def test_validate_wandb_artifact_string_valid_name(artifact_name) -> None:
 
 @pytest.mark.parametrize(
     "artifact_name",
-    ["with/slashes", "with spaces", "illegalpunctuation!", "", "****"],
+    [
+        "with/slashes",
+        "with spaces",
+        "illegalpunctuation!",
+        "",
+        "****",
+        "trailing-newline\n",
+        "ünicode",
+    ],
 )
 def test_validate_wandb_artifact_string_invalid_name(artifact_name) -> None:
     """Ensure WandbArtifactName works with valid artifact names."""
@@ -90,6 +105,34 @@ def test_validate_wandb_artifact_string_invalid_name(artifact_name) -> None:
         _validate_wandb_artifact_string(artifact_name, "test role")
 
 
+def test_parse_is_immutable() -> None:
+    """Ensure parsed WandbArtifactNames can't be modified and can be hashed."""
+    wandb_artifact_name = WandbArtifactName.parse("project/name")
+    with pytest.raises(AttributeError):
+        wandb_artifact_name.version = "v3"  # type: ignore
+    assert hash(wandb_artifact_name) == hash(WandbArtifactName.parse("project/name"))
+
+
+def test_parse_reuses_validated_instances() -> None:
+    """Ensure parsing the same string twice doesn't construct a new instance."""
+    assert WandbArtifactName.parse("project/name:v1") is WandbArtifactName.parse(
+        "project/name:v1",
+    )
+
+
+def test_parsed_artifact_overrides_follow_reassignment() -> None:
+    """Ensure parsed overrides are updated when overrides are reassigned."""
+    runtime_environment = get_runtime_environment()
+    runtime_environment.artifact_overrides = ["project/name:v1"]
+    assert runtime_environment.parsed_artifact_overrides == [
+        WandbArtifactName(None, "project", "name", "v1"),
+    ]
+    runtime_environment.artifact_overrides = ["name:v2"]
+    assert runtime_environment.parsed_artifact_overrides == [
+        WandbArtifactName(None, None, "name", "v2"),
+    ]
+
+
 def test_resolve_artifact() -> None:
     """Test artifact resolution with no overrides."""
     # Ensure no artifact overrides are set.
@@ -156,3 +199,180 @@ def test_resolve_artifact_with_overrides_and_project() -> None:
 
     resolved = WandbArtifactName.resolve_artifact_name("projectname/artifactname")
     assert resolved == "projectname/artifactname:v3"
+
+
+def test_resolve_artifact_cache_respects_overrides() -> None:
+    """Ensure cached resolutions are redone when overrides change."""
+    get_runtime_environment().artifact_overrides = []
+    assert WandbArtifactName.resolve_artifact_name("artifactname") == (
+        "artifactname:latest"
+    )
+
+    get_runtime_environment().artifact_overrides = ["artifactname:v3"]
+    assert WandbArtifactName.resolve_artifact_name("artifactname") == (
+        "artifactname:v3"
+    )
+
+
+def test_map_transfers_preserves_order() -> None:
+    """Ensure parallel transfers return results in the order of their inputs."""
+
+    def slow_double(value: int) -> int:
+        # Make earlier items finish last.
+        time.sleep((10 - value) / 1000)
+        return value * 2
+
+    assert _map_transfers(slow_double, range(10)) == [value * 2 for value in range(10)]
+
+
+def test_from_wandb_api_artifact_sorts_entries() -> None:
+    """Ensure manifest entries are converted in order of their names."""
+    s3_objects = [
+        VersionedS3Object("bucket", "b/file", "v2"),
+        VersionedS3Object("bucket", "a/file", "v1"),
+    ]
+    entries = {
+        s3.key: SimpleNamespace(ref=str(s3.to_aeromancy_uri())) for s3 in s3_objects
+    }
+    wandb_api_artifact = SimpleNamespace(
+        manifest=SimpleNamespace(entries=entries),
+        type="artifact_type",
+        name="project/artifact_name:v0",
+    )
+
+    artifact = AeromancyArtifact.from_wandb_api_artifact(wandb_api_artifact)  # type: ignore
+    assert artifact.name == "artifact_name"
+    assert artifact.s3 == sorted(s3_objects)
+
+
+@pytest.mark.parametrize(
+    ("key", "query"),
+    [("file.txt", ()), ("some/nested/file.txt", (("path", "some/nested/"),))],
+)
+def test_to_s3_viewer_url(key, query) -> None:
+    """Ensure the S3 viewer URL points to the primary file's directory."""
+    artifact = AeromancyArtifact(
+        "artifact_name",
+        "artifact_type",
+        s3=[VersionedS3Object("bucket", key, "version_id")],
+    )
+    viewer_url = artifact.to_s3_viewer_url()
+    assert viewer_url.path == ("spaces", "bucket")
+    assert viewer_url.query == query
+
+
+def test_as_wandb_artifact_metadata() -> None:
+    """Ensure Aeromancy metadata is added without modifying the caller's."""
+    artifact = AeromancyArtifact(
+        "artifact_name",
+        "artifact_type",
+        s3=[VersionedS3Object("bucket", "some/file.txt", "version_id")],
+    )
+    metadata = {"extra": 1}
+    wandb_artifact = artifact.as_wandb_artifact(metadata=metadata)
+
+    assert metadata == {"extra": 1}
+    assert wandb_artifact.metadata == {
+        "extra": 1,
+        "primary_s3_key": "some/file.txt",
+        "primary_s3_bucket": "bucket",
+        "primary_s3_version": "version_id",
+        "viewer_url": "https://cloud.digitalocean.com/spaces/bucket?path=some/",
+        "num_files": 1,
+    }
+
+
+@pytest.mark.parametrize(
+    ("name1", "name2", "expected"),
+    [
+        ("name", "name:v1", True),
+        ("project/name", "name", True),
+        ("entity/project/name", "other/project/name:v2", False),
+        ("project/name", "other/name", False),
+        ("project/name", "project/other", False),
+    ],
+)
+def test_wandbartifactname_matches(name1, name2, expected) -> None:
+    """Ensure artifact names match when all fields set in both match."""
+    parsed1 = WandbArtifactName.parse(name1)
+    parsed2 = WandbArtifactName.parse(name2)
+    assert parsed1.matches(parsed2) == expected
+    assert parsed2.matches(parsed1) == expected
+
+
+def test_declare_input_streaming() -> None:
+    """Ensure streamed inputs yield every file and record the dependency."""
+    s3_objects = [
+        VersionedS3Object("bucket", f"file{index}", "version_id") for index in range(5)
+    ]
+    used_artifacts = []
+    wandb_run = SimpleNamespace(
+        use_artifact=lambda artifact, use_as: used_artifacts.append(artifact.name),
+    )
+    s3_client = SimpleNamespace(fetch=lambda s3: Path("/cache") / s3.key)
+    artifacts = Artifacts(wandb_run, s3_client)  # type: ignore
+    artifact = AeromancyArtifact("artifact_name", "artifact_type", s3=s3_objects)
+
+    streamed_paths = artifacts.declare_input_streaming(artifact)
+    assert used_artifacts == []
+    assert sorted(streamed_paths) == artifacts.declare_input(artifact)
+    assert used_artifacts == ["artifact_name", "artifact_name"]
+
+
+def test_declare_output_strip_prefix() -> None:
+    """Ensure `strip_prefix` is removed from uploaded S3 keys."""
+    logged_artifacts = []
+    wandb_run = SimpleNamespace(log_artifact=logged_artifacts.append)
+    s3_client = SimpleNamespace(
+        put=lambda local_filename, s3: VersionedS3Object(
+            **s3.to_dict(),
+            version_id="v",
+        ),
+    )
+    artifacts = Artifacts(wandb_run, s3_client)  # type: ignore
+
+    artifact = artifacts.declare_output(
+        name="artifact_name",
+        local_filenames=[Path("/a/b/c/d.txt"), Path("/a/b/e.txt")],
+        s3_destination=S3Object("bucket", "dest"),
+        artifact_type="artifact_type",
+        strip_prefix=Path("/a/b"),
+    )
+    assert [s3.key for s3 in artifact.s3] == ["dest/c/d.txt", "dest/e.txt"]
+    assert len(logged_artifacts) == 1
+
+
+def test_declare_input_caches_versioned_names(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Ensure specifically versioned inputs are only looked up once."""
+    looked_up_names = []
+
+    def fake_artifact(name):
+        looked_up_names.append(name)
+        s3 = VersionedS3Object("bucket", "file", "version_id")
+        return SimpleNamespace(
+            manifest=SimpleNamespace(
+                entries={"file": SimpleNamespace(ref=str(s3.to_aeromancy_uri()))},
+            ),
+            type="artifact_type",
+            name=name,
+            qualified_name=name,
+            source_qualified_name=name,
+        )
+
+    monkeypatch.setattr(
+        artifacts_module,
+        "_default_wandb_api",
+        lambda: SimpleNamespace(artifact=fake_artifact),
+    )
+    wandb_run = SimpleNamespace(use_artifact=lambda artifact, use_as: None)
+    s3_client = SimpleNamespace(fetch=lambda s3: Path("/cache") / s3.key)
+    artifacts = Artifacts(wandb_run, s3_client)  # type: ignore
+
+    for _ in range(2):
+        artifacts.declare_input("project/name:v3")
+        artifacts.declare_input("project/name:latest")
+    assert looked_up_names == [
+        "project/name:v3",
+        "project/name:latest",
+        "project/name:latest",
+    ]
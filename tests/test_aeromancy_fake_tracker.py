@@ -0,0 +1,153 @@
+"""Tests for FakeTracker."""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import msgspec
+
+from aeromancy import fake_tracker as fake_tracker_module
+from aeromancy.fake_tracker import FakeArtifactMapping, FakeTracker
+from aeromancy.s3 import S3Object, _decode_records
+
+
+def declare_text_output(
+    tracker: FakeTracker,
+    local_filename,
+    text: str,
+    name: str = "output",
+):
+    """Write `text` to `local_filename` and declare it as an output."""
+    local_filename.write_text(text)
+    return tracker.declare_output(
+        name=name,
+        local_filenames=[local_filename],
+        s3_destination=S3Object("bucket", "outputs"),
+        artifact_type="text",
+    )
+
+
+def count_mapping_entries(tracker: FakeTracker) -> int:
+    """Count the records in the artifact mapping log."""
+    entries, _ = _decode_records(
+        fake_tracker_module._mapping_decoder,
+        tracker.mapping_path.read_bytes(),
+    )
+    return len(entries)
+
+
+def test_artifact_mapping_log(tmp_path, monkeypatch) -> None:
+    """Ensure declared outputs are persisted and the log gets compacted."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    local_filename = tmp_path / "output.txt"
+
+    with FakeTracker(project_name="project") as tracker:
+        for iteration in range(10):
+            declare_text_output(tracker, local_filename, f"Iteration {iteration}")
+        assert count_mapping_entries(tracker) == 10
+
+    assert (
+        count_mapping_entries(tracker) <= fake_tracker_module.MAPPING_COMPACTION_RATIO
+    )
+    [local_path] = FakeTracker(project_name="project").declare_input("output:latest")
+    assert local_path.read_text() == "Iteration 9"
+
+
+def test_artifact_mapping_json_migration(tmp_path, monkeypatch) -> None:
+    """Ensure artifact mappings stored as JSON are still readable."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    tracker = FakeTracker(project_name="project")
+    artifact = declare_text_output(tracker, tmp_path / "output.txt", "Old output")
+    name, _ = tracker.artifact_mapping.artifacts_by_name.popitem()
+
+    json_path = tracker.cache_root_path / "artifact_mapping.json"
+    json_path.write_bytes(msgspec.json.encode(FakeArtifactMapping({name: artifact})))
+    tracker.mapping_path.unlink()
+
+    tracker = FakeTracker(project_name="project")
+    assert tracker.artifact_mapping.artifacts_by_name == {name: artifact}
+    assert count_mapping_entries(tracker) == 1
+    assert not json_path.exists()
+
+
+def test_declare_output_multiple_files(tmp_path, monkeypatch) -> None:
+    """Ensure every file in an output ends up in the cache, in order."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    local_filenames = []
+    for index in range(20):
+        local_filename = tmp_path / "outputs" / f"{index}.txt"
+        local_filename.parent.mkdir(exist_ok=True)
+        local_filename.write_text(f"File {index}")
+        local_filenames.append(local_filename)
+
+    tracker = FakeTracker(project_name="project")
+    artifact = tracker.declare_output(
+        name="outputs",
+        local_filenames=local_filenames,
+        s3_destination=S3Object("bucket", "outputs"),
+        artifact_type="text",
+        strip_prefix=tmp_path / "outputs",
+    )
+    assert [s3.key for s3 in artifact.s3] == [
+        f"outputs/{index}.txt" for index in range(20)
+    ]
+    local_paths = tracker.declare_input(artifact)
+    assert [path.read_text() for path in local_paths] == [
+        f"File {index}" for index in range(20)
+    ]
+
+
+def test_artifact_mapping_incomplete_record(tmp_path, monkeypatch) -> None:
+    """Ensure a partially written mapping record doesn't break later records."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    tracker = FakeTracker(project_name="project")
+    declare_text_output(tracker, tmp_path / "output.txt", "First output")
+    complete_records = tracker.mapping_path.read_bytes()
+    tracker.mapping_path.write_bytes(complete_records + complete_records[:-1])
+
+    tracker = FakeTracker(project_name="project")
+    assert tracker.mapping_path.read_bytes() == complete_records
+    declare_text_output(tracker, tmp_path / "output.txt", "Second output")
+
+    [local_path] = FakeTracker(project_name="project").declare_input("output:latest")
+    assert local_path.read_text() == "Second output"
+
+
+def declare_outputs_in_process(home: Path, prefix: str) -> None:
+    """Declare outputs with a series of FakeTrackers, compacting after each."""
+    fake_tracker_module.MAPPING_COMPACTION_RATIO = 1
+    local_filename = home / f"{prefix}.txt"
+    for run in range(20):
+        with FakeTracker(project_name="project") as tracker:
+            declare_text_output(tracker, local_filename, "Shared")
+            declare_text_output(tracker, local_filename, "Shared")
+            declare_text_output(tracker, local_filename, prefix, name=f"{prefix}{run}")
+
+
+def test_artifact_mapping_shared_between_processes(tmp_path, monkeypatch) -> None:
+    """Ensure compacting the artifact mapping keeps other processes' records."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    with ProcessPoolExecutor(
+        max_workers=2,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        list(executor.map(declare_outputs_in_process, [tmp_path] * 2, "ab"))
+
+    mapping = FakeTracker(project_name="project").artifact_mapping
+    assert set(mapping.artifacts_by_name) == {
+        f"{fake_tracker_module.FAKE_ENTITY}/project/{name}:"
+        f"{fake_tracker_module.FAKE_VERSION}"
+        for name in [
+            "output",
+            *(f"{prefix}{run}" for prefix in "ab" for run in range(20)),
+        ]
+    }
+
+
+def test_tags_are_copied(tmp_path, monkeypatch) -> None:
+    """Ensure Trackers don't modify the tags they were created with."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    tags = {"shared"}
+    tracker = FakeTracker(project_name="project", tags=tags)
+    tracker.tags.add("extra")
+    assert tags == {"shared"}
@@ -0,0 +1,124 @@
+"""Tests for the Aeromancy runner."""
+
+import os
+
+import pytest
+
+from aeromancy import runner
+from aeromancy.runner import (
+    _git_metadata,
+    _git_status,
+    _GitMetadata,
+    _GitStatus,
+    store_environment_variables,
+)
+
+
+def fake_git(monkeypatch: pytest.MonkeyPatch, output: str) -> None:
+    """Make `runner._git` return `output` (for any command)."""
+    monkeypatch.setattr(runner, "_git", lambda *args: output)
+
+
+@pytest.fixture(autouse=True)
+def _clear_git_metadata_cache():
+    """Ensure each test looks up Git metadata again."""
+    _git_metadata.cache_clear()
+    yield
+    _git_metadata.cache_clear()
+
+
+@pytest.mark.parametrize(
+    ("ref_names", "branch"),
+    [
+        ("HEAD -> feature, origin/feature", "feature"),
+        # With log.decorate=full, ref names are fully qualified.
+        ("HEAD -> refs/heads/feature, refs/remotes/origin/feature", "feature"),
+        ("HEAD -> feature/nested", "feature/nested"),
+        # Detached HEAD.
+        ("HEAD, tag: v1, feature", "HEAD"),
+        ("HEAD", "HEAD"),
+    ],
+)
+def test_git_metadata(monkeypatch: pytest.MonkeyPatch, ref_names, branch) -> None:
+    """Ensure `git show` output is parsed, including the branch name."""
+    fake_git(monkeypatch, f"c0ffee\0abc123\0{ref_names}\0Subject\n\nBody\n")
+    assert _git_metadata() == _GitMetadata(
+        commit="c0ffee",
+        tree="abc123",
+        branch=branch,
+        message="Subject\n\nBody\n",
+    )
+
+
+def test_git_metadata_message_with_nul(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Ensure the commit message is kept whole even if it has separators in it."""
+    fake_git(monkeypatch, "c0ffee\0abc123\0HEAD -> feature\0Subject\0Body\n")
+    assert _git_metadata().message == "Subject\0Body\n"
+
+
+def test_git_status(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Ensure all kinds of `git status --porcelain=v2` records are parsed."""
+    records = [
+        "# branch.oid 35fcf33bdbb68bd088cc9d1f57aad5b58285f61e",
+        "# branch.head feature",
+        "# branch.upstream origin/feature",
+        "# branch.ab +1 -0",
+        "1 .M N... 100644 100644 100644 6178079 6178079 b.txt",
+        "1 A. N... 000000 100644 100644 0000000 6178079 with spaces.txt",
+        # Renames are followed by a separate record with the original path.
+        "2 R. N... 100644 100644 100644 7898192 7898192 R100 c.txt",
+        "a.txt",
+        "u UU N... 100644 100644 100644 100644 1111111 2222222 3333333 conflict.txt",
+        "? new.txt",
+        "? new dir/file.txt",
+        "! ignored.txt",
+    ]
+    fake_git(monkeypatch, "\0".join(records) + "\0")
+    assert _git_status() == _GitStatus(
+        branch="feature",
+        changed_files=["b.txt", "with spaces.txt", "c.txt", "conflict.txt"],
+        untracked_files=["new.txt", "new dir/file.txt"],
+    )
+
+
+def test_git_status_detached_clean(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Ensure a clean working tree with a detached HEAD is parsed."""
+    fake_git(
+        monkeypatch,
+        "# branch.oid 35fcf33bdbb68bd088cc9d1f57aad5b58285f61e\0"
+        "# branch.head (detached)\0",
+    )
+    assert _git_status() == _GitStatus(
+        branch="(detached)",
+        changed_files=[],
+        untracked_files=[],
+    )
+
+
+@pytest.mark.parametrize("existing_contents", ["", "STALE\n"])
+def test_env_file_is_private(tmp_path, monkeypatch, existing_contents) -> None:
+    """Ensure the env file is made private, even if it already existed."""
+    monkeypatch.chdir(tmp_path)
+    # Variables for the container are also set in our own environment.
+    monkeypatch.setattr(os, "environ", os.environ.copy())
+    env_file_path = tmp_path / ".env_file"
+
+    def store() -> None:
+        store_environment_variables(
+            git_ref="c0ffee",
+            docker_hash="abc123",
+            dev_mode=True,
+            debug_mode=False,
+            aeromancy_artifact_overrides=[],
+            extra_env_vars=[],
+        )
+
+    if not existing_contents:
+        # An older version may have created it with the same contents.
+        store()
+        existing_contents = env_file_path.read_text()
+    env_file_path.write_text(existing_contents)
+    env_file_path.chmod(0o644)
+
+    store()
+    assert env_file_path.stat().st_mode & 0o777 == 0o600
@@ -1,6 +1,33 @@
 """Tests for S3 structures."""
 
-from aeromancy.s3 import S3Bucket, S3Object
+import contextlib
+import hashlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import hyperlink
+import msgspec
+import pytest
+
+from aeromancy import s3
+from aeromancy.s3 import (
+    CACHE_MAX_BYTES_ENV,
+    Cache,
+    CacheEntry,
+    S3Bucket,
+    S3Object,
+    VersionedS3Object,
+    _checksums_encoder,
+    _encode_record,
+    _parse_cache_max_bytes,
+    copy_and_digest,
+    fast_copy,
+    file_digest,
+    list_objects_iterator,
+)
 
 
 def test_s3bucket_str() -> None:
@@ -79,3 +106,329 @@ def test_s3object_to_dict() -> None:
     s3_object = S3Object("bucket-name", "key")
     expected = {"bucket": "bucket-name", "key": "key"}
     assert s3_object.to_dict() == expected
+
+
+@pytest.mark.parametrize(
+    "key",
+    ["file.txt", "some/nested/file.txt", "with spaces/and%20escapes.txt", "ünï.txt"],
+)
+def test_versioneds3object_from_aeromancy_uri_str(key) -> None:
+    """Ensure URL strings parse the same way as with `hyperlink`."""
+    aeromancy_uri_str = str(
+        VersionedS3Object("bucket", key, "version-id").to_aeromancy_uri(),
+    )
+    assert VersionedS3Object.from_aeromancy_uri_str(
+        aeromancy_uri_str,
+    ) == VersionedS3Object.from_aeromancy_uri(hyperlink.parse(aeromancy_uri_str))
+
+
+def test_fast_copy(tmp_path) -> None:
+    """Ensure `fast_copy` copies contents and permissions over existing files."""
+    source = tmp_path / "source"
+    source.write_bytes(bytes(range(256)) * 10_000)
+    source.chmod(0o640)
+    destination = tmp_path / "destination"
+    destination.write_bytes(b"this should be replaced" * 100_000)
+
+    fast_copy(source, destination)
+    assert destination.read_bytes() == source.read_bytes()
+    assert destination.stat().st_mode == source.stat().st_mode
+
+
+def test_fast_copy_other_platforms(tmp_path, monkeypatch) -> None:
+    """Ensure Linux-specific ioctls aren't used on other platforms."""
+
+    def ioctl(*args):
+        raise AssertionError("ioctl shouldn't be called")
+
+    monkeypatch.setattr(s3.sys, "platform", "darwin")
+    monkeypatch.setattr(s3.fcntl, "ioctl", ioctl)
+    source = tmp_path / "source"
+    source.write_bytes(b"contents")
+    destination = tmp_path / "destination"
+
+    fast_copy(source, destination)
+    assert destination.read_bytes() == b"contents"
+
+
+def test_copy_and_digest(tmp_path) -> None:
+    """Ensure `copy_and_digest` copies and checksums in one pass."""
+    source = tmp_path / "source"
+    source.write_bytes(bytes(range(256)) * 10_000)
+    destination = tmp_path / "destination"
+
+    assert copy_and_digest(source, destination) == file_digest(source)
+    assert destination.read_bytes() == source.read_bytes()
+
+
+@pytest.mark.parametrize("size", [100, 2_560_000, 70_000_000])
+def test_file_digest(tmp_path, size) -> None:
+    """Ensure `file_digest` matches hashing the whole file at once."""
+    contents = (bytes(range(256)) * (size // 256 + 1))[:size]
+    filename = tmp_path / "file"
+    filename.write_bytes(contents)
+    expected = hashlib.sha1(contents, usedforsecurity=False).hexdigest()
+    assert file_digest(filename) == expected
+
+
+def test_file_digest_notices_changes(tmp_path) -> None:
+    """Ensure cached digests are recomputed when files are modified."""
+    filename = tmp_path / "file"
+    filename.write_bytes(b"before")
+    os.utime(filename, ns=(0, 0))
+    before = file_digest(filename)
+    assert file_digest(filename) == before
+
+    filename.write_bytes(b"after!")
+    os.utime(filename, ns=(1, 1))
+    assert (
+        file_digest(filename)
+        == hashlib.sha1(b"after!", usedforsecurity=False).hexdigest()
+    )
+
+
+def add_cached_file(cache: Cache, version_id: str, contents: str) -> Path:
+    """Add a file to `cache` as though it was uploaded with `S3Client.put`."""
+    cached_filename = cache.get_path(VersionedS3Object("bucket", "key", version_id))
+    cached_filename.write_text(contents)
+    cache.finalize_adding_file(cached_filename, S3Object("bucket", "key"))
+    return cached_filename
+
+
+def test_cache_checksum_log(tmp_path) -> None:
+    """Ensure cached file checksums are appended to and reloaded from disk."""
+    cache = Cache(tmp_path)
+    first_filename = add_cached_file(cache, "v1", "first")
+    add_cached_file(cache, "v2", "second")
+    first_sha1 = hashlib.sha1(b"first", usedforsecurity=False).hexdigest()
+
+    reloaded_cache = Cache(tmp_path)
+    assert reloaded_cache.get_version(S3Object("bucket", "key"), first_sha1) == "v1"
+    checksum_path = tmp_path / "checksums.msgpack"
+    log_size = checksum_path.stat().st_size
+
+    # Re-adding an identical entry shouldn't grow the log.
+    reloaded_cache.finalize_adding_file(first_filename, S3Object("bucket", "key"))
+    assert checksum_path.stat().st_size == log_size
+
+
+def test_cache_checksum_log_incomplete_record(tmp_path) -> None:
+    """Ensure a partially written checksum record doesn't break the cache."""
+    add_cached_file(Cache(tmp_path), "v1", "1")
+    checksum_path = tmp_path / "checksums.msgpack"
+    complete_records = checksum_path.read_bytes()
+    checksum_path.write_bytes(complete_records + complete_records[:-1])
+
+    cache = Cache(tmp_path)
+    assert checksum_path.read_bytes() == complete_records
+    add_cached_file(cache, "v2", "2")
+    assert len(Cache(tmp_path)._cacheentry_by_checksum) == 2
+
+
+def test_cache_checksum_log_append_in_progress(tmp_path, monkeypatch) -> None:
+    """Ensure records which another process is appending aren't dropped."""
+    add_cached_file(Cache(tmp_path), "v1", "1")
+    checksum_path = tmp_path / "checksums.msgpack"
+    entry = CacheEntry(
+        s3_object=S3Object("bucket", "key"),
+        cached_filename=str(tmp_path / "bucket" / "key" / "v2"),
+        checksum_sha1="0123abcd",
+    )
+    record = _encode_record(_checksums_encoder, entry)
+    with checksum_path.open("ab") as checksums:
+        checksums.write(record[:-1])
+    expected_records = checksum_path.read_bytes() + record[-1:]
+
+    file_lock = s3._file_lock
+
+    @contextlib.contextmanager
+    def file_lock_after_append(lock_path: Path):
+        # The other process finishes appending before we get the lock.
+        with checksum_path.open("ab") as checksums:
+            checksums.write(record[-1:])
+        with file_lock(lock_path):
+            yield
+
+    monkeypatch.setattr(s3, "_file_lock", file_lock_after_append)
+    cache = Cache(tmp_path)
+    assert cache.get_version(S3Object("bucket", "key"), "0123abcd") == "v2"
+    assert checksum_path.read_bytes() == expected_records
+
+
+def test_cache_eviction(tmp_path) -> None:
+    """Ensure least recently used files are evicted from size-limited caches."""
+    cache = Cache(tmp_path, max_bytes=350)
+    filenames = [
+        add_cached_file(cache, f"v{version}", str(version) * 100)
+        for version in range(3)
+    ]
+    for age, filename in zip([10, 30, 20], filenames, strict=True):
+        os.utime(filename, (time.time() - age, 0))
+
+    # Adding a fourth file in a later run (once this Cache is gone, so its files
+    # aren't in use) goes over the limit, so the least recently used file is
+    # evicted to get under 90% of it.
+    del cache
+    newest_filename = add_cached_file(Cache(tmp_path, max_bytes=350), "v3", "3" * 100)
+    assert [filename.exists() for filename in filenames] == [True, False, True]
+    assert newest_filename.exists()
+
+    reloaded_cache = Cache(tmp_path)
+    sha1 = hashlib.sha1(b"1" * 100, usedforsecurity=False).hexdigest()
+    assert reloaded_cache.get_version(S3Object("bucket", "key"), sha1) is None
+    sha1 = hashlib.sha1(b"2" * 100, usedforsecurity=False).hexdigest()
+    assert reloaded_cache.get_version(S3Object("bucket", "key"), sha1) == "v2"
+
+
+def test_cache_size_refinalized_file(tmp_path) -> None:
+    """Ensure files finalized more than once are only counted once."""
+    cache = Cache(tmp_path, max_bytes=1000)
+    add_cached_file(cache, "v0", "0" * 100)
+    filename = add_cached_file(cache, "v1", "1" * 100)
+    cache.finalize_adding_file(filename, S3Object("bucket", "key"))
+    assert cache._size_bytes == 200
+
+
+def test_cache_eviction_skips_files_in_use(tmp_path) -> None:
+    """Ensure files added or used through a cache aren't evicted by it."""
+    filenames = [
+        add_cached_file(Cache(tmp_path), f"v{version}", str(version) * 100)
+        for version in range(2)
+    ]
+    for age, filename in zip([20, 10], filenames, strict=True):
+        os.utime(filename, (time.time() - age, 0))
+
+    cache = Cache(tmp_path, max_bytes=150)
+    cache.mark_used(filenames[0])
+    add_cached_file(cache, "v2", "2" * 100)
+    assert [filename.exists() for filename in filenames] == [True, False]
+
+    # Everything left is in use, so the cache has to go over its limit.
+    add_cached_file(cache, "v3", "3" * 100)
+    assert filenames[0].exists()
+
+
+def test_cache_eviction_skips_other_directories(tmp_path) -> None:
+    """Ensure eviction and repair leave non-bucket directories alone."""
+    state_filename = tmp_path / ".aeromancy" / "doit" / "project.db"
+    state_filename.parent.mkdir(parents=True)
+    state_filename.write_text("state" * 100)
+    os.utime(state_filename, (0, 0))
+
+    old_filename = add_cached_file(Cache(tmp_path), "v0", "0" * 100)
+    cache = Cache(tmp_path, max_bytes=150)
+    add_cached_file(cache, "v1", "1" * 100)
+    assert state_filename.exists()
+    assert not old_filename.exists()
+
+    cache.repair()
+    assert all(
+        ".aeromancy" not in entry.cached_filename
+        for entries in cache._cacheentry_by_checksum.values()
+        for entry in entries
+    )
+
+
+def add_files_to_shared_cache(cache_root: Path, prefix: str) -> bool:
+    """Add files to a size-limited cache, each with a new Cache (like a new run).
+
+    Returns whether each file was still there after adding it.
+    """
+    all_kept = True
+    for index in range(50):
+        version_id = f"{prefix}{index}"
+        cache = Cache(cache_root, max_bytes=1000)
+        filename = add_cached_file(cache, version_id, version_id.ljust(100))
+        all_kept = all_kept and filename.exists()
+    return all_kept
+
+
+def test_cache_shared_between_processes(tmp_path) -> None:
+    """Ensure processes sharing a size-limited cache keep its index consistent."""
+    with ProcessPoolExecutor(
+        max_workers=2,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        results = executor.map(add_files_to_shared_cache, [tmp_path] * 2, "ab")
+        assert list(results) == [True, True]
+
+    cache = Cache(tmp_path)
+    indexed_filenames = {
+        entry.cached_filename
+        for entries in cache._cacheentry_by_checksum.values()
+        for entry in entries
+    }
+    cached_filenames = {
+        str(path) for path in (tmp_path / "bucket").rglob("*") if path.is_file()
+    }
+    assert indexed_filenames == cached_filenames
+    assert len(cached_filenames) <= 10
+
+
+@pytest.mark.parametrize(
+    ("cache_max_bytes", "expected"),
+    [
+        (None, None),
+        ("", None),
+        ("1000", 1000),
+        ("50 GB", 50 * 10**9),
+        ("50GB", 50 * 10**9),
+        ("1.5 tb", 15 * 10**11),
+    ],
+)
+def test_parse_cache_max_bytes(cache_max_bytes, expected) -> None:
+    """Ensure cache sizes are parsed with and without units."""
+    assert _parse_cache_max_bytes(cache_max_bytes) == expected
+
+
+@pytest.mark.parametrize("cache_max_bytes", ["50 parsecs", "abc GB", "1.2.3 GB", "GB"])
+def test_parse_cache_max_bytes_invalid(cache_max_bytes) -> None:
+    """Ensure unknown units and malformed numbers are rejected."""
+    with pytest.raises(ValueError, match=CACHE_MAX_BYTES_ENV):
+        _parse_cache_max_bytes(cache_max_bytes)
+
+
+def test_cache_checksum_json_migration(tmp_path) -> None:
+    """Ensure checksums are converted from the older JSON format."""
+    entry = CacheEntry(
+        s3_object=S3Object("bucket", "key"),
+        cached_filename=str(tmp_path / "bucket" / "key" / "v1"),
+        checksum_sha1="0123abcd",
+    )
+    (tmp_path / "checksums.json").write_bytes(msgspec.json.encode([entry]))
+
+    assert Cache(tmp_path).get_version(S3Object("bucket", "key"), "0123abcd") == "v1"
+    assert not (tmp_path / "checksums.json").exists()
+    assert Cache(tmp_path).get_version(S3Object("bucket", "key"), "0123abcd") == "v1"
+
+
+class FakePaginatedS3Client:
+    """Just enough of a boto3 S3 client to paginate over canned responses."""
+
+    def __init__(self, pages: list[dict]):
+        """Create a client which returns `pages` for any listing."""
+        self.pages = pages
+
+    def get_paginator(self, operation_name: str):
+        """Return a paginator (for any operation)."""
+        return self
+
+    def paginate(self, **unused_kwargs):
+        """Iterate over the canned pages."""
+        return iter(self.pages)
+
+
+def test_list_objects_iterator_empty_page() -> None:
+    """Ensure empty pages in the middle of a listing are skipped."""
+    s3_client = FakePaginatedS3Client(
+        [{"Contents": [{"Key": "dir/a"}]}, {}, {"Contents": [{"Key": "dir/b"}]}],
+    )
+    keys = list(list_objects_iterator(s3_client, "bucket", "dir/"))
+    assert keys == ["dir/a", "dir/b"]
+
+
+def test_list_objects_iterator_no_matches() -> None:
+    """Ensure listings without any objects raise `FileNotFoundError`."""
+    s3_client = FakePaginatedS3Client([{}])
+    with pytest.raises(FileNotFoundError):
+        list(list_objects_iterator(s3_client, "bucket", "dir/"))
@@ -48,6 +48,16 @@ def test_as_json_obj_basic() -> None:
     assert json_obj == {"a": 3.14, "b": "test", "c": [4, 5, 6]}
 
 
+def test_as_json_obj_keys() -> None:
+    """Ensure `as_json_objects` uses strings for keys, like JSON."""
+
+    class KeyedStruct(AeromancyStruct):
+        counts: dict[int, int]
+
+    json_obj = KeyedStruct(counts={1: 2}).as_json_objects()
+    assert json_obj == {"counts": {"1": 2}}
+
+
 def test_validate_with_valid_input() -> None:
     """Make sure `validate` method accepts valid input."""
     bogus_struct = BogusStruct(a=3.14, b="test", c=[4, 5, 6])